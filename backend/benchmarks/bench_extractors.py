@@ -0,0 +1,103 @@
+# benchmarks/bench_extractors.py
+"""
+Compare HTML extractor backends on a saved corpus of pages.
+
+Reports extraction time and the number of chunks each backend produces with the
+same splitter /submit-urls uses. Save pages into the corpus first:
+
+    python benchmarks/bench_extractors.py --save https://docs.python.org/3/library/os.html
+    python benchmarks/bench_extractors.py --repeat 5 --json results.json
+"""
+import argparse
+import hashlib
+import json
+import pathlib
+import statistics
+import sys
+import time
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from extractors import EXTRACTORS  # noqa: E402
+
+DEFAULT_CORPUS = BACKEND_DIR / "benchmarks" / "pages"
+
+# Fallback pages shipped with the repo, used when the corpus directory is empty
+FALLBACK_PAGES = [BACKEND_DIR / "error.html", BACKEND_DIR / "templates" / "index.html"]
+
+
+def save_pages(urls, corpus_dir: pathlib.Path):
+    import requests
+
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    for url in urls:
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".html"
+        (corpus_dir / name).write_bytes(response.content)
+        print(f"Saved {url} -> {corpus_dir / name} ({len(response.content)} bytes)")
+
+
+def load_corpus(corpus_dir: pathlib.Path):
+    pages = sorted(corpus_dir.glob("*.html")) if corpus_dir.exists() else []
+    if not pages:
+        print(f"No pages in {corpus_dir}, falling back to the HTML files shipped with the repo")
+        pages = [page for page in FALLBACK_PAGES if page.exists()]
+    return [(page.name, page.read_text(encoding="utf-8", errors="replace")) for page in pages]
+
+
+def run(corpus, backends, repeat: int):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    results = {}
+    for backend in backends:
+        extract = EXTRACTORS[backend]
+        timings = []
+        chars = 0
+        chunks = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            texts = [extract(html) for _, html in corpus]
+            timings.append(time.perf_counter() - started)
+        for text in texts:
+            chars += len(text)
+            chunks += len(splitter.split_text(text)) if text else 0
+        results[backend] = {
+            "pages": len(corpus),
+            "total_ms_median": round(statistics.median(timings) * 1000, 2),
+            "per_page_ms_median": round(statistics.median(timings) * 1000 / max(len(corpus), 1), 3),
+            "text_chars": chars,
+            "chunks": chunks,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=pathlib.Path, default=DEFAULT_CORPUS, help="directory of saved .html pages")
+    parser.add_argument("--save", nargs="+", metavar="URL", help="download pages into the corpus and exit")
+    parser.add_argument("--backends", nargs="+", default=list(EXTRACTORS), choices=list(EXTRACTORS))
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes over the corpus per backend")
+    parser.add_argument("--json", type=pathlib.Path, help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save, args.corpus)
+        return
+
+    corpus = load_corpus(args.corpus)
+    results = run(corpus, args.backends, args.repeat)
+
+    print(f"{'backend':<10} {'pages':>6} {'total ms':>10} {'ms/page':>9} {'chars':>10} {'chunks':>7}")
+    for backend, row in results.items():
+        print(f"{backend:<10} {row['pages']:>6} {row['total_ms_median']:>10} {row['per_page_ms_median']:>9} "
+              f"{row['text_chars']:>10} {row['chunks']:>7}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_json_responses.py
+"""
+Serialization time and bytes on the wire for a learning-path dashboard payload.
+
+Builds a synthetic GET /api/learning-paths body (200 paths by default, with
+text-heavy overview, roadmap and subtopic explanations) and compares FastAPI's
+default path (jsonable_encoder + JSONResponse) with FastJSONResponse, then
+reports the body size uncompressed, gzipped and brotli-compressed:
+
+    python benchmarks/bench_json_responses.py --paths 200 --repeat 20 --json results.json
+"""
+import argparse
+import gzip
+import json
+import pathlib
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from responses import BROTLI_QUALITY, GZIP_LEVEL, FastJSONResponse, brotli, orjson  # noqa: E402
+
+WORDS = (
+    "learn build deploy model data pipeline python service test design pattern cache index query "
+    "network security container cluster scale latency memory thread process async stream event"
+).split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(sentence(rng, rng.randint(8, 18)) for _ in range(sentences))
+
+
+def dashboard_payload(paths: int, subtopics: int = 10, seed: int = 7) -> list:
+    """A list of learning paths shaped like the GET /api/learning-paths response"""
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1)
+    payload = []
+    for i in range(paths):
+        names = [f"{sentence(rng, 3)[:-1]} {j + 1}" for j in range(subtopics)]
+        payload.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "topic": sentence(rng, 4)[:-1],
+            "level": rng.choice(["Junior", "Intermediate", "Senior", "Lead"]),
+            "overview": paragraph(rng, 12),
+            "subtopics": names,
+            "subtopics_detailed": [{"name": name, "explanation": paragraph(rng, 5)} for name in names],
+            "roadmap": "\n".join(f"Step {j + 1}: Master {name}" for j, name in enumerate(names)),
+            "estimated_hours": round(rng.uniform(5, 40), 1),
+            "progress": round(rng.uniform(0, 100), 2),
+            "created_at": now + timedelta(hours=i),
+            "last_updated": now + timedelta(hours=i, minutes=30),
+        })
+    return payload
+
+
+def time_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def run(paths: int, repeat: int) -> dict:
+    payload = dashboard_payload(paths)
+    serializers = {
+        "default": lambda: JSONResponse(jsonable_encoder(payload)).body,
+        "fast": lambda: FastJSONResponse(payload).body,
+    }
+    results = {"paths": paths, "orjson": orjson is not None, "serialization": {}, "compression": {}}
+    for name, serialize in serializers.items():
+        results["serialization"][name] = {"ms_median": time_ms(serialize, repeat), "bytes": len(serialize())}
+
+    body = serializers["fast"]()
+    encoders = {"identity": lambda: body, "gzip": lambda: gzip.compress(body, compresslevel=GZIP_LEVEL)}
+    if brotli is not None:
+        encoders["br"] = lambda: brotli.compress(body, quality=BROTLI_QUALITY)
+    for name, encode in encoders.items():
+        results["compression"][name] = {"ms_median": time_ms(encode, repeat), "bytes": len(encode())}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", type=int, default=200, help="learning paths in the payload")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per measurement")
+    parser.add_argument("--json", type=pathlib.Path, help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.paths, args.repeat)
+
+    print(f"{args.paths} paths, orjson {'installed' if results['orjson'] else 'missing'}")
+    print(f"{'serializer':<12} {'ms':>9} {'bytes':>10}")
+    for name, row in results["serialization"].items():
+        print(f"{name:<12} {row['ms_median']:>9} {row['bytes']:>10}")
+    print(f"{'encoding':<12} {'ms':>9} {'bytes':>10}")
+    for name, row in results["compression"].items():
+        print(f"{name:<12} {row['ms_median']:>9} {row['bytes']:>10}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# benchmarks/loadtest.py
+"""
+Load test for the API against a local DIAL stand-in.
+
+Drives /token, /api/topics, /api/learning-paths, the progress endpoint,
+/submit-urls, /ask, /generate-quiz and /submit-answers at a fixed concurrency.
+Then it reports throughput and p50/p95/p99 latency per endpoint. With
+--start-server the API runs in a fresh temporary working directory (empty
+SQLite database and Chroma store). DIAL_API_URL points it at the mock started
+by this script, so no real model quota is used:
+
+    python benchmarks/loadtest.py --start-server --concurrency 16 --requests 200 \\
+        --latency-ms 800 --jitter-ms 200 --error-rate 0.01 --seed 1 --json baseline.json
+
+To test an already running server, start benchmarks/mock_dial.py, point the
+server's DIAL_API_URL at it, and pass --base-url and --mock-url instead.
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+
+from mock_dial import add_mock_arguments, mock_config_from_args, start_mock_server  # noqa: E402
+from trace_summary import percentile  # noqa: E402
+
+SCENARIOS = ["token", "topics", "learning_paths", "progress", "submit_urls", "ask", "generate_quiz", "submit_answers"]
+QUESTIONS = [
+    "What is the main topic of the page?",
+    "Which options are described?",
+    "How do I get started?",
+    "What are the limitations?",
+    "Summarize the key points.",
+]
+LEVELS = ["Junior", "Intermediate", "Senior", "Lead"]
+
+
+class LoadTestState:
+    """Users, tokens and ids created during setup and earlier scenarios"""
+
+    def __init__(self, base_url: str, page_urls):
+        self.base_url = base_url.rstrip("/")
+        self.page_urls = page_urls
+        self.users = []  # (username, password, token)
+        self.path_ids = []
+        self.quiz_ids = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def user(self, i: int):
+        return self.users[i % len(self.users)]
+
+    def auth(self, i: int) -> dict:
+        return {"Authorization": f"Bearer {self.user(i)[2]}"}
+
+
+def is_error(response: requests.Response) -> bool:
+    """HTTP errors, and the {"error": ...} / {"status": "error"} bodies the RAG endpoints return with 200"""
+    if response.status_code >= 400:
+        return True
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and ("error" in body or body.get("status") == "error")
+
+
+def scenario_request(name: str, state: LoadTestState, i: int) -> requests.Response:
+    session, url = state.session, state.base_url
+    if name == "token":
+        username, password, _ = state.user(i)
+        return session.post(f"{url}/token", data={"username": username, "password": password})
+    if name == "topics":
+        response = session.post(f"{url}/api/topics", headers=state.auth(i),
+                                json={"topic": f"Load test topic {i}", "level": LEVELS[i % len(LEVELS)],
+                                      "component_id": "loadtest"})
+        if response.status_code == 200:
+            with state.lock:
+                state.path_ids.append((i % len(state.users), response.json()["id"]))
+        return response
+    if name == "learning_paths":
+        return session.get(f"{url}/api/learning-paths", headers=state.auth(i))
+    if name == "progress":
+        if not state.path_ids:
+            raise RuntimeError("progress needs learning paths; run the topics scenario first")
+        owner, path_id = state.path_ids[i % len(state.path_ids)]
+        return session.put(f"{url}/api/learning-paths/{path_id}/progress", headers=state.auth(owner),
+                           json={"progress": (i * 7) % 100, "completed_subtopics": [f"concept {i % 5}"]})
+    if name == "submit_urls":
+        return session.post(f"{url}/submit-urls", headers=state.auth(i), json={"urls": state.page_urls})
+    if name == "ask":
+        return session.post(f"{url}/ask", headers=state.auth(i), json={"question": QUESTIONS[i % len(QUESTIONS)]})
+    if name == "generate_quiz":
+        response = session.post(f"{url}/generate-quiz", headers=state.auth(i), json={"urls": state.page_urls})
+        if response.status_code == 200 and "quiz_id" in response.json():
+            with state.lock:
+                state.quiz_ids.append((i % len(state.users), response.json()["quiz_id"]))
+        return response
+    if name == "submit_answers":
+        if not state.quiz_ids:
+            raise RuntimeError("submit_answers needs quizzes; run the generate_quiz scenario first")
+        owner, quiz_id = state.quiz_ids[i % len(state.quiz_ids)]
+        answers = {str(q): f"Answer {q} from the load test." for q in range(3)}
+        return session.post(f"{url}/submit-answers", headers=state.auth(owner),
+                            json={"answers": answers, "quiz_id": quiz_id})
+    raise ValueError(f"Unknown scenario {name}")
+
+
+def run_scenario(name: str, state: LoadTestState, requests_count: int, concurrency: int) -> dict:
+    latencies = []
+    statuses = Counter()
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            response = scenario_request(name, state, i)
+            status, failed = str(response.status_code), is_error(response)
+        except requests.RequestException as e:
+            status, failed = type(e).__name__, True
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests_count)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests_count,
+        "errors": errors,
+        "status_counts": dict(statuses),
+        "throughput_rps": round(requests_count / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def setup_users(state: LoadTestState, count: int):
+    run_id = uuid.uuid4().hex[:8]
+    for n in range(count):
+        username = f"loadtest-{run_id}-{n}"
+        password = f"pw-{run_id}-{n}"
+        state.session.post(f"{state.base_url}/register",
+                           json={"username": username, "email": f"{username}@example.com", "password": password})
+        response = state.session.post(f"{state.base_url}/token", data={"username": username, "password": password})
+        response.raise_for_status()
+        state.users.append((username, password, response.json()["access_token"]))
+
+
+def start_api_server(port: int, workers: int, mock_url: str, workdir: str) -> subprocess.Popen:
+    # Admission control would turn most of a load test into 429s; opt back in with RATE_LIMIT_ENABLED=true
+    env = dict(os.environ, DIAL_API_URL=mock_url, DIAL_API_KEY=os.getenv("DIAL_API_KEY", "mock-key"),
+               RATE_LIMIT_ENABLED=os.getenv("RATE_LIMIT_ENABLED", "false"))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--app-dir", str(BACKEND_DIR),
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/metrics", timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("API server did not start within 120 seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="API under test (ignored with --start-server)")
+    parser.add_argument("--mock-url", help="running mock_dial.py to use for scrape pages instead of starting one")
+    parser.add_argument("--mock-port", type=int, default=0, help="port for the mock started by this script")
+    parser.add_argument("--start-server", action="store_true", help="run the API in a temporary working directory")
+    parser.add_argument("--server-port", type=int, default=8765)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--users", type=int, default=4, help="users to register and spread requests over")
+    parser.add_argument("--json", type=pathlib.Path, help="write the baseline to this JSON file")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    mock = None
+    mock_url = args.mock_url
+    if not mock_url:
+        mock = start_mock_server(port=args.mock_port, **mock_config_from_args(args))
+        mock_url = f"http://127.0.0.1:{mock.server_port}"
+    page_urls = [f"{mock_url}/pages/{name}" for name in requests.get(f"{mock_url}/pages/", timeout=5).json()["pages"]]
+
+    server = None
+    workdir = None
+    base_url = args.base_url
+    if args.start_server:
+        workdir = tempfile.TemporaryDirectory(prefix="loadtest-")
+        server = start_api_server(args.server_port, args.server_workers, mock_url, workdir.name)
+        base_url = f"http://127.0.0.1:{args.server_port}"
+
+    results = {}
+    try:
+        state = LoadTestState(base_url, page_urls)
+        setup_users(state, args.users)
+        for name in args.scenarios:
+            results[name] = run_scenario(name, state, args.requests, args.concurrency)
+            row = results[name]
+            print(f"{name:<16} {row['throughput_rps']:>8} rps  p50 {row['p50_ms']:>9} ms  p95 {row['p95_ms']:>9} ms  "
+                  f"p99 {row['p99_ms']:>9} ms  errors {row['errors']}/{row['requests']}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+            workdir.cleanup()
+        if mock is not None:
+            mock.shutdown()
+
+    baseline = {
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "config": {
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "users": args.users,
+            "server_workers": args.server_workers if args.start_server else None,
+            "mock": {
+                "latency_ms": args.latency_ms,
+                "jitter_ms": args.jitter_ms,
+                "error_rate": args.error_rate,
+                "error_status": args.error_status,
+                "seed": args.seed,
+                "pages": len(page_urls),
+            },
+        },
+        "endpoints": results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(baseline, indent=2))
+    else:
+        print(json.dumps(baseline, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# benchmarks/mock_dial.py
+"""
+Local DIAL stand-in for load tests.
+
+Serves OpenAI-style chat completions at /openai/deployments/<name>/chat/completions
+with tunable latency and error rate, a model list at /openai/models, and HTML
+scrape targets from local files at /pages/<file> (index at /pages/):
+
+    python benchmarks/mock_dial.py --port 8900 --latency-ms 800 --jitter-ms 300 --error-rate 0.02
+    DIAL_API_URL=http://127.0.0.1:8900 uvicorn server:app
+
+Replies follow the prompt formats server.py expects (topic summaries, quiz
+questions, answer evaluations), so responses parse like real ones. Requests
+with "stream": true get server-sent events: the first line after a tenth of
+the sampled latency, the rest spread over the remainder.
+"""
+import argparse
+import json
+import pathlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+DEFAULT_PAGES = BACKEND_DIR / "benchmarks" / "pages"
+# Fallback pages shipped with the repo, used when the pages directory is empty
+FALLBACK_PAGES = [BACKEND_DIR / "error.html", BACKEND_DIR / "templates" / "index.html"]
+
+# The deployments of the real DIAL, from the model list dumped into model_details.txt
+MODEL_DETAILS = BACKEND_DIR / "model_details.txt"
+
+
+def load_deployments(path: pathlib.Path = MODEL_DETAILS) -> dict:
+    """{deployment id: chat_completion capability} from a model_details.txt dump"""
+    deployments = {}
+    current = None
+    for line in path.read_text(encoding="utf-8", errors="replace").splitlines():
+        line = line.strip()
+        if line.startswith("Model ID:"):
+            current = line.split(":", 1)[1].strip()
+            deployments[current] = True
+        elif current and line.startswith("- chat_completion:"):
+            deployments[current] = line.split(":", 1)[1].strip() == "True"
+    return deployments
+
+
+DEPLOYMENTS = load_deployments()
+
+
+class MockConfig:
+    def __init__(self, latency_ms: float = 500, jitter_ms: float = 0, error_rate: float = 0.0,
+                 error_status: int = 500, seed: int = None, pages=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.pages = {page.name: page for page in (pages or [])}
+
+    def sample(self):
+        """(delay in seconds, whether to fail) for one request"""
+        with self.lock:
+            delay = max(self.random.gauss(self.latency_ms, self.jitter_ms) if self.jitter_ms else self.latency_ms, 0)
+            return delay / 1000, self.random.random() < self.error_rate
+
+
+def load_pages(pages_dir: pathlib.Path):
+    pages = sorted(pages_dir.glob("*.html")) if pages_dir.exists() else []
+    return pages or [page for page in FALLBACK_PAGES if page.exists()]
+
+
+def completion_text(prompt: str, rng: random.Random) -> str:
+    if "Provide a structured summary for the topic" in prompt:
+        topic = prompt.split('topic: "', 1)[-1].split('"', 1)[0]
+        lines = [f"Overview:\n{topic} covers core concepts, tooling and practice for working engineers.\n", "Subtopics:"]
+        for i in range(1, rng.randint(5, 8) + 1):
+            lines.append(f"{i}. {topic} concept {i}: What concept {i} is and when to apply it in practice.")
+        return "\n".join(lines)
+    if "Generate 10 conceptual quiz questions" in prompt:
+        return "\n".join(f"{i}. Explain key idea number {i} from the material?" for i in range(1, 11))
+    if "Evaluate the answer" in prompt:
+        score = round(rng.random(), 2)
+        return json.dumps({"score": score, "feedback": "Covers the main idea." if score > 0.5 else "Missing key details."})
+    if "detailed explanation" in prompt:
+        return "A detailed explanation. " * 80
+    return "Based on the context, the answer is that the documented behaviour applies. " * 3
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    config: MockConfig = None
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/openai/models":
+            self._send_json(200, {"data": [
+                {"id": name, "model": name, "object": "model", "capabilities": {"chat_completion": chat}}
+                for name, chat in DEPLOYMENTS.items()
+            ]})
+        elif path.rstrip("/") == "/pages":
+            self._send_json(200, {"pages": sorted(self.config.pages)})
+        elif path.startswith("/pages/") and unquote(path[len("/pages/"):]) in self.config.pages:
+            body = self.config.pages[unquote(path[len("/pages/"):])].read_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        parts = urlparse(self.path).path.strip("/").split("/")
+        if len(parts) != 5 or parts[:2] != ["openai", "deployments"] or parts[3:] != ["chat", "completions"]:
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        delay, fail = self.config.sample()
+        stream = bool(request.get("stream"))
+        time.sleep(delay / 10 if stream else delay)
+        if fail:
+            headers = {"Retry-After": "1"} if self.config.error_status == 429 else None
+            self._send_json(self.config.error_status, {"error": {"message": "Injected failure"}}, headers)
+            return
+
+        prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+        with self.config.lock:
+            content = completion_text(prompt, self.config.random)
+        prompt_tokens = max(len(prompt) // 4, 1)
+        completion_tokens = max(len(content) // 4, 1)
+        if stream:
+            self._send_stream(parts[2], content, delay * 0.9)
+            return
+        self._send_json(200, {
+            "id": f"chatcmpl-mock-{time.time_ns()}",
+            "object": "chat.completion",
+            "model": parts[2],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    def _send_stream(self, model: str, content: str, duration: float):
+        """Send content as OpenAI-style chunks, one line per chunk, over `duration` seconds"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        pieces = content.splitlines(keepends=True) or [content]
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(duration / len(pieces))
+            chunk = {
+                "id": f"chatcmpl-mock-{time.time_ns()}",
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **config) -> ThreadingHTTPServer:
+    """Start the mock in a background thread; the bound port is server.server_port"""
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"config": MockConfig(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-dial", daemon=True).start()
+    return server
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=500, help="mean completion latency")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of completions that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="status of injected failures (e.g. 429)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible latency and failures")
+    parser.add_argument("--pages", type=pathlib.Path, default=DEFAULT_PAGES, help="directory of .html scrape targets")
+
+
+def mock_config_from_args(args) -> dict:
+    return {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "error_status": args.error_status,
+        "seed": args.seed,
+        "pages": load_pages(args.pages),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_mock_server(args.host, args.port, **mock_config_from_args(args))
+    print(f"Mock DIAL on http://{args.host}:{server.server_port} "
+          f"({len(server.RequestHandlerClass.config.pages)} scrape pages)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
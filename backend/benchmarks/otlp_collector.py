@@ -0,0 +1,80 @@
+# benchmarks/otlp_collector.py
+"""
+Minimal OTLP/HTTP (JSON encoding) trace collector for local load tests.
+
+Accepts POST /v1/traces and appends every received span to a JSON-lines file
+in the same format as tracing.JSONLinesExporter:
+
+    python benchmarks/otlp_collector.py --port 4318 --output traces.jsonl
+    TRACE_EXPORTER=otlp uvicorn server:app --workers 4
+    python benchmarks/trace_summary.py traces.jsonl
+"""
+import argparse
+import json
+import pathlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(output: pathlib.Path):
+    lock = threading.Lock()
+
+    class CollectorHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.rstrip("/") != "/v1/traces":
+                self.send_error(404)
+                return
+            if "json" not in self.headers.get("Content-Type", ""):
+                self.send_error(415, "Only the OTLP JSON encoding is supported")
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except ValueError:
+                self.send_error(400, "Invalid JSON")
+                return
+
+            lines = []
+            for resource_spans in body.get("resourceSpans", []):
+                service = next(
+                    (attribute["value"].get("stringValue") for attribute in
+                     resource_spans.get("resource", {}).get("attributes", [])
+                     if attribute.get("key") == "service.name"),
+                    "unknown"
+                )
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    for span in scope_spans.get("spans", []):
+                        span["serviceName"] = service
+                        lines.append(json.dumps(span, separators=(",", ":")))
+            with lock, open(output, "a", encoding="utf-8") as handle:
+                handle.writelines(line + "\n" for line in lines)
+
+            payload = b"{}"
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return CollectorHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", type=pathlib.Path, default=pathlib.Path("traces.jsonl"))
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.output))
+    print(f"Collecting spans on http://{args.host}:{args.port}/v1/traces -> {args.output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/trace_summary.py
+"""
+Per-stage latency percentiles from a JSON-lines span file.
+
+Reads spans written by tracing.JSONLinesExporter or benchmarks/otlp_collector.py,
+reports p50/p95/p99 per span name, and for each root span (endpoint) shows how
+its slowest 1% of requests split their time across child stages:
+
+    python benchmarks/trace_summary.py traces.jsonl --json summary.json
+"""
+import argparse
+import json
+import math
+import pathlib
+from collections import defaultdict
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    return values[min(max(math.ceil(q / 100 * len(values)) - 1, 0), len(values) - 1)]
+
+
+def load_spans(path: pathlib.Path):
+    spans = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                span = json.loads(line)
+                span["duration_ms"] = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+                spans.append(span)
+    return spans
+
+
+def summarize(spans) -> dict:
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    children = defaultdict(list)
+    for span in spans:
+        durations[span["name"]].append(span["duration_ms"])
+        if span.get("status", {}).get("code") == 2:
+            errors[span["name"]] += 1
+        if span.get("parentSpanId"):
+            children[span["parentSpanId"]].append(span)
+
+    stages = {}
+    for name, values in sorted(durations.items()):
+        values.sort()
+        stages[name] = {
+            "count": len(values),
+            "errors": errors[name],
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+        }
+
+    # Where the tail goes: mean share of each direct child stage in the slowest 1% of roots
+    # Roots are spans whose parent is not in the file (none, or an upstream caller's)
+    span_ids = {span["spanId"] for span in spans}
+    roots = defaultdict(list)
+    for span in spans:
+        if span.get("parentSpanId") not in span_ids:
+            roots[span["name"]].append(span)
+    tail = {}
+    for name, root_spans in roots.items():
+        root_spans.sort(key=lambda span: span["duration_ms"])
+        slowest = root_spans[-max(len(root_spans) // 100, 1):]
+        shares = defaultdict(float)
+        for root in slowest:
+            for child in children.get(root["spanId"], []):
+                shares[child["name"]] += child["duration_ms"] / max(root["duration_ms"], 1e-9) / len(slowest)
+        tail[name] = {stage: round(share, 3) for stage, share in sorted(shares.items(), key=lambda item: -item[1])}
+
+    return {"stages": stages, "p99_breakdown": tail}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("spans", type=pathlib.Path, help="JSON-lines span file")
+    parser.add_argument("--json", type=pathlib.Path, help="also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    summary = summarize(load_spans(args.spans))
+
+    print(f"{'span':<36} {'count':>7} {'errors':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, row in summary["stages"].items():
+        print(f"{name:<36} {row['count']:>7} {row['errors']:>7} {row['p50_ms']:>10} {row['p95_ms']:>10} {row['p99_ms']:>10}")
+    for root, shares in summary["p99_breakdown"].items():
+        if shares:
+            print(f"\n{root}: share of p99 time by stage")
+            for stage, share in shares.items():
+                print(f"  {stage:<34} {share:>6.1%}")
+
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
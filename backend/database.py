@@ -1,5 +1,5 @@
 # database.py
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, ForeignKey, Text, DateTime
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, ForeignKey, Text, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -60,7 +60,9 @@ class Subtopic(Base):
     __tablename__ = "subtopics"
     
     id = Column(Integer, primary_key=True, index=True)
-    learning_path_id = Column(String, ForeignKey("learning_paths.id"))
+    learning_path_id = Column(String, ForeignKey("learning_paths.id"), index=True)
+    # 1-based order within the learning path, as generated; the API addresses subtopics by it
+    position = Column(Integer)
     name = Column(String)
     explanation = Column(Text)
     
@@ -70,6 +72,10 @@ class Subtopic(Base):
     # Relationship with resources
     resources = relationship("Resource", back_populates="subtopic", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_subtopics_learning_path_id_position", "learning_path_id", "position", unique=True),
+    )
+
 # Define CompletedSubtopic model
 class CompletedSubtopic(Base):
     __tablename__ = "completed_subtopics"
@@ -86,7 +92,7 @@ class Resource(Base):
     __tablename__ = "resources"
     
     id = Column(Integer, primary_key=True, index=True)
-    subtopic_id = Column(Integer, ForeignKey("subtopics.id"))
+    subtopic_id = Column(Integer, ForeignKey("subtopics.id"), index=True)
     type = Column(String)  # "image", "code", "reference", "video"
     content = Column(Text)
     title = Column(String, nullable=True)
@@ -95,6 +101,17 @@ class Resource(Base):
     # Relationship with subtopic
     subtopic = relationship("Subtopic", back_populates="resources")
 
+# Define QuizSession model for per-user quizzes generated by /generate-quiz
+class QuizSession(Base):
+    __tablename__ = "quiz_sessions"
+    
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    questions = Column(Text)  # JSON-encoded list of question strings
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, index=True)
+
 # Create all tables
 Base.metadata.create_all(bind=engine)
 
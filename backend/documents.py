@@ -0,0 +1,219 @@
+# documents.py
+import codecs
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Supported upload types for RAG ingestion
+DOCUMENT_KINDS = {
+    ".pdf": "pdf",
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".txt": "text",
+    ".text": "text",
+}
+
+DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", str(max((os.cpu_count() or 2) - 1, 1))))
+# PDF pages handed to a worker per task, and text bytes per block for text/markdown
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+TEXT_BLOCK_BYTES = int(os.getenv("TEXT_BLOCK_BYTES", str(256 * 1024)))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+_MD_FENCE = re.compile(r"^\s*(```|~~~).*$", re.MULTILINE)
+_MD_INDENTED_CODE = ("    ", "\t")
+_MD_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_MD_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_MD_HEADING = re.compile(r"^ {0,3}#{1,6}(?:[ \t]+|$)", re.MULTILINE)
+# Only * and ` delimiters, and not inside words: underscores are left alone so
+# identifiers like get_user_by_id or __init__ survive, and so does a*b*c
+_MD_EMPHASIS = re.compile(r"(?<![\w*`])(\*\*|\*|`)(?=\S)(.+?)(?<=\S)\1(?![\w*`])")
+# Known tag names only, and opening tags not glued to a preceding word, so
+# generics like List<String> or Vec<u8> and comparisons like a<b and c>d survive
+_MD_HTML_TAG_NAMES = (
+    r"(?:a|abbr|b|blockquote|br|center|code|dd|del|details|div|dl|dt|em|figcaption|figure|font|"
+    r"h[1-6]|hr|i|iframe|img|ins|kbd|li|mark|ol|p|picture|pre|s|section|small|source|span|strike|"
+    r"strong|sub|summary|sup|table|tbody|td|tfoot|th|thead|tr|u|ul|video)"
+)
+_MD_HTML_TAG = re.compile(
+    rf"(?:(?<!\w)<{_MD_HTML_TAG_NAMES}(?:\s[^<>]*)?/?|</{_MD_HTML_TAG_NAMES}\s*)>",
+    re.IGNORECASE
+)
+
+
+def document_kind(filename: str) -> Optional[str]:
+    """Return "pdf", "markdown" or "text" for a supported filename, else None"""
+    return DOCUMENT_KINDS.get(os.path.splitext(filename or "")[1].lower())
+
+
+def _strip_markdown_prose(text: str) -> str:
+    text = _MD_IMAGE.sub(r"\1", text)
+    text = _MD_LINK.sub(r"\1", text)
+    text = _MD_HEADING.sub("", text)
+    text = _MD_EMPHASIS.sub(r"\2", text)
+    return _MD_HTML_TAG.sub("", text)
+
+
+def strip_markdown(text: str, in_fence: bool = False) -> str:
+    """
+    Reduce Markdown to plain text, keeping code and link text.
+    Fenced and indented code blocks are kept verbatim (minus the fence lines);
+    `in_fence` says the text starts inside a fenced block.
+    """
+    parts = []
+    prose = []
+    previous_blank = True
+    previous_code = False
+    for line in text.splitlines(keepends=True):
+        if _MD_FENCE.match(line):
+            is_code = True
+            in_fence = not in_fence
+            line = line[len(line.rstrip("\r\n")):]
+        else:
+            # Indented code cannot interrupt a paragraph, it follows a blank line
+            is_code = in_fence or (line.startswith(_MD_INDENTED_CODE) and (previous_blank or previous_code))
+        if is_code:
+            if prose:
+                parts.append(_strip_markdown_prose("".join(prose)))
+                prose = []
+            parts.append(line)
+        else:
+            prose.append(line)
+        previous_blank = not line.strip()
+        previous_code = is_code and not previous_blank
+    if prose:
+        parts.append(_strip_markdown_prose("".join(prose)))
+    return "".join(parts)
+
+
+def _make_splitter(chunk_size: int, chunk_overlap: int):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def split_pdf_pages(path: str, start: int, stop: int, chunk_size: int, chunk_overlap: int) -> List[Tuple[int, List[str]]]:
+    """Extract and split pages [start, stop) of a PDF (runs in a worker process)"""
+    from pypdf import PdfReader
+
+    splitter = _make_splitter(chunk_size, chunk_overlap)
+    pages = []
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        reader = PdfReader(mapped)
+        for page_number in range(start, stop):
+            text = reader.pages[page_number].extract_text() or ""
+            pages.append((page_number + 1, splitter.split_text(text) if text.strip() else []))
+    return pages
+
+
+def split_text_block(block: str, kind: str, chunk_size: int, chunk_overlap: int,
+                     in_fence: bool = False) -> List[str]:
+    """Split one text/markdown block (runs in a worker process)"""
+    if kind == "markdown":
+        block = strip_markdown(block, in_fence)
+    return _make_splitter(chunk_size, chunk_overlap).split_text(block) if block.strip() else []
+
+
+def pdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return len(PdfReader(mapped).pages)
+
+
+def iter_text_blocks(path: str, block_bytes: int = TEXT_BLOCK_BYTES) -> Iterator[str]:
+    """
+    Yield a text file as blocks of roughly `block_bytes`, cut at paragraph breaks.
+    The file is memory-mapped and decoded incrementally, so only one block is
+    held in memory at a time.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for offset in range(0, len(mapped), block_bytes):
+            pending += decoder.decode(mapped[offset:offset + block_bytes])
+            cut = pending.rfind("\n\n")
+            if cut == -1:
+                cut = pending.rfind("\n")
+            if cut <= 0:
+                continue
+            yield pending[:cut]
+            pending = pending[cut:].lstrip("\n")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    # Created on first use from a request thread; spawned, not forked from the threaded server
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=DOCUMENT_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def _ordered_results(tasks, max_in_flight: int):
+    """Run (fn, args) tasks on the pool with a bounded window, yielding results in order"""
+    executor = _get_executor()
+    in_flight = deque()
+    for fn, args in tasks:
+        in_flight.append(executor.submit(fn, *args))
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+def iter_document_chunks(path: str, kind: str, doc_key: str, source: str,
+                         chunk_size: int = 1000, chunk_overlap: int = 100) -> Iterator[Tuple[str, str, dict]]:
+    """
+    Yield (chunk id, chunk text, metadata) for a stored document.
+    Pages (PDF) or blocks (text/markdown) are split in the process pool while the
+    caller embeds earlier chunks; at most two tasks per worker are in flight.
+    """
+    max_in_flight = DOCUMENT_WORKERS * 2
+
+    if kind == "pdf":
+        page_count = pdf_page_count(path)
+        tasks = (
+            (split_pdf_pages, (path, start, min(start + PDF_PAGES_PER_TASK, page_count), chunk_size, chunk_overlap))
+            for start in range(0, page_count, PDF_PAGES_PER_TASK)
+        )
+        for pages in _ordered_results(tasks, max_in_flight):
+            for page_number, chunks in pages:
+                for chunk_idx, chunk in enumerate(chunks):
+                    yield f"{doc_key}_p{page_number}_{chunk_idx}", chunk, {"source": source, "page": page_number}
+        return
+
+    def text_tasks():
+        # Blocks are cut at blank lines, which can fall inside a fenced code block
+        in_fence = False
+        for block in iter_text_blocks(path):
+            yield split_text_block, (block, kind, chunk_size, chunk_overlap, in_fence)
+            if kind == "markdown" and len(_MD_FENCE.findall(block)) % 2:
+                in_fence = not in_fence
+
+    tasks = text_tasks()
+    for block_number, chunks in enumerate(_ordered_results(tasks, max_in_flight)):
+        for chunk_idx, chunk in enumerate(chunks):
+            yield f"{doc_key}_b{block_number}_{chunk_idx}", chunk, {"source": source, "block": block_number}
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
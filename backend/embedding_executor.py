@@ -0,0 +1,210 @@
+# embedding_executor.py
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sentence-transformer encoding runs in worker processes when EMBEDDING_WORKERS > 0.
+# Concurrent requests are merged into batches of up to EMBEDDING_MAX_BATCH_SIZE texts,
+# waiting at most EMBEDDING_MAX_LATENCY_MS for more requests to arrive.
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
+EMBEDDING_MAX_LATENCY_MS = float(os.getenv("EMBEDDING_MAX_LATENCY_MS", "5"))
+
+_model = None
+
+
+def _init_worker(model_name: str):
+    global _model
+    from sentence_transformers import SentenceTransformer
+
+    _model = SentenceTransformer(model_name)
+
+
+def _embedding_dimension() -> int:
+    return int(_model.get_sentence_embedding_dimension())
+
+
+def _encode_into(texts: List[str], shm_name: str, dimension: int) -> int:
+    """Encode texts and write them straight into the parent's shared memory block"""
+    embeddings = _model.encode(texts, convert_to_numpy=True, batch_size=len(texts))
+    # Spawned workers share the parent's resource tracker, which already tracks the block
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        target = np.ndarray((len(texts), dimension), dtype=np.float32, buffer=shm.buf)
+        target[:] = embeddings
+        del target
+    finally:
+        shm.close()
+    return len(texts)
+
+
+class _SharedBlock:
+    """
+    Keeps a shared memory block alive for as long as any array viewing it exists.
+    NumPy arrays built from this object hold a reference to it as their base.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape):
+        self._shm = shm
+        self._view = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        self.__array_interface__ = self._view.__array_interface__
+
+    def __del__(self):
+        self._view = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+
+class _Request:
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+
+
+class EmbeddingExecutor:
+    """
+    Micro-batching embedding executor backed by a process pool.
+    Requests from many threads are coalesced into one encode call per batch; the
+    results come back through shared memory and are returned as NumPy views
+    without copying.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, workers: int = None,
+                 max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE, max_latency_ms: float = EMBEDDING_MAX_LATENCY_MS):
+        self.workers = max(workers or EMBEDDING_WORKERS, 1)
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        # Workers are spawned rather than forked from the server with its threads, locks and sockets
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(model_name,),
+                                         mp_context=multiprocessing.get_context("spawn"))
+        self.dimension = self._pool.submit(_embedding_dimension).result()
+        self._requests: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        # At most two batches per worker are in flight; further requests wait and batch up
+        self._in_flight = threading.BoundedSemaphore(self.workers * 2)
+        self._dispatcher = threading.Thread(target=self._dispatch, name="embedding-dispatcher", daemon=True)
+        self._dispatcher.start()
+        logger.info(f"Embedding executor started: {self.workers} workers, batches of up to "
+                    f"{self.max_batch_size} texts, {max_latency_ms} ms window")
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for embedding; the future resolves to an (n, dim) float32 array"""
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result(np.empty((0, self.dimension), dtype=np.float32))
+        else:
+            self._requests.put(request)
+        return request.future
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.submit(texts).result()
+
+    def _collect_batch(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_latency
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Shutting down: flush this batch, the dispatcher stops on the next get
+                self._requests.put(None)
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _dispatch(self):
+        while True:
+            first = self._requests.get()
+            if first is None:
+                return
+            batch = self._collect_batch(first)
+            self._in_flight.acquire()
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                self._in_flight.release()
+                for request in batch:
+                    request.future.set_exception(e)
+
+    def _run_batch(self, batch: List[_Request]):
+        texts = [text for request in batch for text in request.texts]
+        shm = shared_memory.SharedMemory(create=True, size=max(len(texts) * self.dimension * 4, 1))
+        try:
+            task = self._pool.submit(_encode_into, texts, shm.name, self.dimension)
+        except Exception:
+            # No callback will ever free the block (e.g. the pool is shut down or broken)
+            shm.close()
+            shm.unlink()
+            raise
+
+        def finish(done: Future):
+            self._in_flight.release()
+            error = done.exception()
+            # The name is no longer needed; the mapping lives until the last view is freed
+            shm.unlink()
+            if error is not None:
+                shm.close()
+                for request in batch:
+                    request.future.set_exception(error)
+                return
+            block = np.asarray(_SharedBlock(shm, (len(texts), self.dimension)))
+            offset = 0
+            for request in batch:
+                request.future.set_result(block[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+        task.add_done_callback(finish)
+
+    def shutdown(self):
+        self._requests.put(None)
+        self._dispatcher.join(timeout=5)
+        self._pool.shutdown(wait=False)
+
+
+class PooledEmbeddingFunction:
+    """
+    Chroma-compatible embedding function that encodes through an EmbeddingExecutor.
+    The executor is started on first use, never at import: spawned workers re-import
+    the main module, and a pool built there would try to start pools of its own.
+    """
+
+    def __init__(self, executor: Optional[EmbeddingExecutor] = None, **executor_args):
+        self._executor = executor
+        self._executor_args = executor_args
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> EmbeddingExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = EmbeddingExecutor(**self._executor_args)
+        return self._executor
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        return list(self.executor.embed(list(input)))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
@@ -0,0 +1,206 @@
+# extractors.py
+import os
+import re
+from typing import Callable, Dict, Union
+
+# Backend used by extract_text when none is given: "auto", "lxml" or "bs4"
+HTML_EXTRACTOR = os.getenv("HTML_EXTRACTOR", "auto")
+
+# Elements that never carry article content
+BOILERPLATE_TAGS = (
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object",
+    "nav", "header", "footer", "aside", "form", "button", "select", "dialog",
+)
+
+# Landmark roles and class/id names used by menus, footers and cookie banners.
+# Names must equal a whole class token or the id, so "main-nav-wrapper" or
+# "ads-free" do not match "nav" or "ads".
+BOILERPLATE_ROLES = ("navigation", "banner", "contentinfo", "complementary", "search", "dialog", "alert")
+BOILERPLATE_NAMES = frozenset((
+    "cookie", "cookies", "cookie-banner", "cookie-consent", "consent", "gdpr", "banner",
+    "newsletter", "subscribe", "share", "sharing", "share-buttons", "social", "social-share",
+    "breadcrumb", "breadcrumbs", "sidebar", "menu", "main-menu", "nav", "navbar", "navigation",
+    "footer", "site-footer", "site-header", "masthead", "advert", "ads", "ad", "promo", "popup",
+    "modal", "skip-link",
+))
+
+# Elements that hold the main content; neither they nor their ancestors are ever dropped
+CONTENT_LANDMARKS = "//main | //article | //*[@role='main']"
+
+# Never part of the text, even when boilerplate removal is skipped
+NON_TEXT_TAGS = ("script", "style", "noscript", "template")
+
+BLOCK_TAGS = frozenset((
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd", "table", "tr",
+    "pre", "blockquote", "figure", "figcaption", "h1", "h2", "h3", "h4", "h5", "h6", "hr",
+))
+
+# Blocks whose text is mostly link text (menus, tag clouds, "related" lists) are dropped
+LINK_DENSITY_THRESHOLD = 0.5
+LINK_DENSITY_MAX_CHARS = 2000
+
+_INLINE_WHITESPACE = re.compile(r"[ \t\r\f\v\u00a0]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of spaces, strip lines and keep at most one blank line between paragraphs"""
+    lines = (_INLINE_WHITESPACE.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def extract_with_bs4(html: Union[str, bytes]) -> str:
+    """Legacy extractor: html.parser + get_text(), no boilerplate removal"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    return soup.get_text().strip()
+
+
+def extract_with_lxml(html: Union[str, bytes]) -> str:
+    """Fast extractor: lxml parse, boilerplate removal and main-content detection"""
+    root = _parse(html)
+    if root is None:
+        return ""
+
+    _drop_boilerplate(root)
+    content = _find_main_content(root)
+    _drop_link_dense_blocks(content)
+    text = _block_text(content)
+    if text:
+        return text
+
+    # Everything looked like boilerplate; the whole body beats returning nothing
+    root = _parse(html)
+    for element in [e for e in root.iter() if not isinstance(e.tag, str) or e.tag in NON_TEXT_TAGS]:
+        if element.getparent() is not None:
+            element.drop_tree()
+    body = root.find("body")
+    return _block_text(body if body is not None else root)
+
+
+def _parse(html: Union[str, bytes]):
+    import lxml.html
+
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration
+        return lxml.html.document_fromstring(html.encode("utf-8") if isinstance(html, str) else html)
+    except Exception:
+        return None
+
+
+def _block_text(content) -> str:
+    # Block boundaries become newlines so the splitters can break on paragraphs
+    for element in content.iter():
+        if not isinstance(element.tag, str):
+            continue
+        if element.tag in BLOCK_TAGS:
+            element.text = "\n" + (element.text or "")
+            element.tail = "\n" + (element.tail or "")
+        elif element.tag == "br":
+            element.tail = "\n" + (element.tail or "")
+        elif element.tag in ("td", "th"):
+            element.tail = " " + (element.tail or "")
+
+    return normalize_whitespace("".join(content.itertext()))
+
+
+def _is_boilerplate(element) -> bool:
+    if element.tag in ("header", "footer"):
+        # Article headers/footers hold titles and bylines; only page-level ones are chrome
+        return not any(ancestor.tag in ("article", "main") for ancestor in element.iterancestors())
+    if element.tag in BOILERPLATE_TAGS:
+        return True
+    if element.get("role") in BOILERPLATE_ROLES or element.get("aria-hidden") == "true":
+        return True
+    names = element.get("class", "").lower().split() + [element.get("id", "").strip().lower()]
+    return any(name in BOILERPLATE_NAMES for name in names)
+
+
+def _drop_boilerplate(root):
+    protected = set()
+    for landmark in root.xpath(CONTENT_LANDMARKS):
+        protected.add(landmark)
+        protected.update(landmark.iterancestors())
+    doomed = [
+        element for element in root.iter()
+        if not isinstance(element.tag, str)
+        or (element.tag not in ("html", "body") and element not in protected and _is_boilerplate(element))
+    ]
+    # Comments and processing instructions have a non-string tag and are dropped too
+    for element in doomed:
+        if element.getparent() is not None:
+            element.drop_tree()
+
+
+def _find_main_content(root):
+    """Prefer explicit main/article landmarks, falling back to the whole body"""
+    candidates = root.xpath("//main | //article | //*[@role='main'] | //*[@id='content'] | //*[@id='main']")
+    if candidates:
+        best = max(candidates, key=lambda element: len(element.text_content()))
+        if len(best.text_content().strip()) > 0:
+            return best
+    body = root.find("body")
+    return body if body is not None else root
+
+
+def _drop_link_dense_blocks(content):
+    """Remove short blocks made almost entirely of links, computed in one bottom-up pass"""
+    text_length: Dict[object, int] = {}
+    link_length: Dict[object, int] = {}
+    doomed = []
+
+    for element in reversed(list(content.iter())):
+        if not isinstance(element.tag, str):
+            continue
+        total = len((element.text or "").strip())
+        links = 0
+        for child in element:
+            total += text_length.get(child, 0) + len((child.tail or "").strip())
+            links += link_length.get(child, 0)
+        if element.tag == "a":
+            links = total
+        text_length[element] = total
+        link_length[element] = links
+
+        if (element is not content and element.tag in ("div", "ul", "ol", "section", "table")
+                and 0 < total <= LINK_DENSITY_MAX_CHARS and links / total > LINK_DENSITY_THRESHOLD):
+            doomed.append(element)
+
+    # Only drop outermost doomed blocks; their descendants go with them
+    doomed_set = set(doomed)
+    for element in doomed:
+        if not any(ancestor in doomed_set for ancestor in element.iterancestors()):
+            element.drop_tree()
+
+
+EXTRACTORS: Dict[str, Callable[[Union[str, bytes]], str]] = {
+    "bs4": extract_with_bs4,
+    "lxml": extract_with_lxml,
+}
+
+
+def register_extractor(name: str, extractor: Callable[[Union[str, bytes]], str]):
+    """Register an additional extractor backend under the given name"""
+    EXTRACTORS[name] = extractor
+
+
+def get_extractor(name: str = None) -> Callable[[Union[str, bytes]], str]:
+    """Resolve an extractor by name; "auto" picks lxml when installed, else bs4"""
+    name = name or HTML_EXTRACTOR
+    if name == "auto":
+        try:
+            import lxml.html  # noqa: F401
+            name = "lxml"
+        except ImportError:
+            name = "bs4"
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown HTML extractor '{name}', expected one of {', '.join(EXTRACTORS)}")
+    return EXTRACTORS[name]
+
+
+def extract_text(html: Union[str, bytes], backend: str = None) -> str:
+    """Extract readable main-content text from an HTML document"""
+    return get_extractor(backend)(html)
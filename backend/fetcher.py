@@ -0,0 +1,155 @@
+# fetcher.py
+import codecs
+import os
+import re
+from typing import Optional
+
+import requests
+
+# Upper bound on decoded response bytes read per URL
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "10"))
+FETCH_CHUNK_SIZE = 64 * 1024
+
+# Content types worth extracting text from; anything else is skipped before download
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+TEXT_CONTENT_TYPES = HTML_CONTENT_TYPES + (
+    "text/plain", "text/markdown", "text/x-markdown", "text/xml", "application/xml",
+)
+
+# Bytes inspected for a BOM or <meta charset> when the header does not declare one
+SNIFF_BYTES = 4096
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_\-:.]+)""", re.IGNORECASE)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+class FetchResult:
+    """Outcome of fetching one URL: decoded text, or the reason it was skipped"""
+
+    def __init__(self, url: str, text: str = "", content_type: Optional[str] = None,
+                 skip_reason: Optional[str] = None):
+        self.url = url
+        self.text = text
+        self.content_type = content_type
+        self.skip_reason = skip_reason
+
+    @property
+    def ok(self) -> bool:
+        return self.skip_reason is None
+
+    @property
+    def is_html(self) -> bool:
+        return self.content_type in HTML_CONTENT_TYPES
+
+
+def _parse_content_type(header: Optional[str]):
+    if not header:
+        return None, None
+    parts = [part.strip() for part in header.split(";")]
+    media_type = parts[0].lower() or None
+    charset = None
+    for param in parts[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value:
+            charset = value.strip().strip("\"'")
+    return media_type, charset
+
+
+def _valid_encoding(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def sniff_encoding(head: bytes, is_html: bool = True) -> str:
+    """Detect the encoding of a document from its first bytes"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    if is_html:
+        match = _META_CHARSET.search(head)
+        encoding = _valid_encoding(match.group(1).decode("ascii", "ignore")) if match else None
+        if encoding:
+            return encoding
+    try:
+        head.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sniffed window is still UTF-8
+        if e.start >= len(head) - 3 and e.reason == "unexpected end of data":
+            return "utf-8"
+    try:
+        from charset_normalizer import from_bytes
+
+        best = from_bytes(head).best()
+        if best is not None and _valid_encoding(best.encoding):
+            return best.encoding
+    except ImportError:
+        pass
+    return "windows-1252"
+
+
+def fetch_text(url: str, max_bytes: int = None, session: requests.Session = None) -> FetchResult:
+    """
+    Stream a URL with a byte cap and return its decoded text.
+    Non-text content types and oversized bodies are aborted before they are
+    buffered; the body is decoded incrementally as it arrives.
+    """
+    max_bytes = max_bytes or FETCH_MAX_BYTES
+    http = session or requests
+    try:
+        with http.get(url, stream=True, timeout=FETCH_TIMEOUT_SECONDS) as response:
+            if response.status_code >= 400:
+                return FetchResult(url, skip_reason=f"HTTP {response.status_code}")
+
+            media_type, charset = _parse_content_type(response.headers.get("Content-Type"))
+            if media_type and media_type not in TEXT_CONTENT_TYPES:
+                return FetchResult(url, content_type=media_type,
+                                   skip_reason=f"unsupported content type {media_type}")
+
+            declared_length = response.headers.get("Content-Length")
+            if declared_length and declared_length.isdigit() and int(declared_length) > max_bytes:
+                return FetchResult(url, content_type=media_type,
+                                   skip_reason=f"content length {declared_length} exceeds limit of {max_bytes} bytes")
+
+            # Assume HTML when the server sends no content type at all
+            media_type = media_type or "text/html"
+            encoding = _valid_encoding(charset)
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace") if encoding else None
+            head = b""
+            parts = []
+            received = 0
+
+            for chunk in response.iter_content(chunk_size=FETCH_CHUNK_SIZE):
+                received += len(chunk)
+                if received > max_bytes:
+                    return FetchResult(url, content_type=media_type,
+                                       skip_reason=f"body exceeds limit of {max_bytes} bytes")
+                if decoder is None:
+                    head += chunk
+                    if len(head) < SNIFF_BYTES:
+                        continue
+                    encoding = sniff_encoding(head, media_type in HTML_CONTENT_TYPES)
+                    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                    chunk, head = head, b""
+                parts.append(decoder.decode(chunk))
+
+            if decoder is None:
+                encoding = sniff_encoding(head, media_type in HTML_CONTENT_TYPES)
+                decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                parts.append(decoder.decode(head))
+            parts.append(decoder.decode(b"", final=True))
+
+            text = "".join(parts)
+            if not text.strip():
+                return FetchResult(url, content_type=media_type, skip_reason="empty body")
+            return FetchResult(url, text=text, content_type=media_type)
+    except requests.RequestException as e:
+        return FetchResult(url, skip_reason=f"request failed: {e.__class__.__name__}")
@@ -0,0 +1,115 @@
+# ingestion.py
+import logging
+import queue
+import threading
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from fetcher import FetchResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_PREFETCH = 2
+
+_DONE = object()
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of at most `size` items from an iterable"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_pages(urls: List[str], fetch: Callable[[str], FetchResult], prefetch: int = DEFAULT_PREFETCH,
+               skipped: Optional[List[dict]] = None) -> Iterator[Tuple[int, str, str]]:
+    """
+    Fetch pages in a background thread and yield (index, url, text).
+    The bounded queue provides backpressure: at most `prefetch` fetched pages
+    wait in memory while the consumer splits and embeds the current one.
+    URLs that produced no text are recorded in `skipped` with their reason.
+    """
+    pages: "queue.Queue" = queue.Queue(maxsize=max(prefetch, 1))
+    stop = threading.Event()
+
+    def producer():
+        try:
+            for idx, url in enumerate(urls):
+                if stop.is_set():
+                    return
+                try:
+                    result = fetch(url)
+                except Exception as e:
+                    logger.error(f"Error fetching {url}: {str(e)}")
+                    result = FetchResult(url, skip_reason=f"error: {str(e)}")
+                pages.put((idx, url, result))
+        finally:
+            pages.put(_DONE)
+
+    worker = threading.Thread(target=producer, name="ingestion-fetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                return
+            idx, url, result = item
+            if not result.ok:
+                logger.info(f"Skipped {url}: {result.skip_reason}")
+                if skipped is not None:
+                    skipped.append({"url": url, "reason": result.skip_reason})
+                continue
+            yield idx, url, result.text
+    finally:
+        # Unblock the producer if the consumer stopped early
+        stop.set()
+        while worker.is_alive():
+            try:
+                pages.get_nowait()
+            except queue.Empty:
+                worker.join(timeout=0.1)
+
+
+def iter_chunks(pages: Iterable[Tuple[int, str, str]], split: Callable[[str], List[str]],
+                with_metadata: bool = True) -> Iterator[Tuple[str, str, Optional[dict]]]:
+    """Split each page and yield (chunk id, chunk text, metadata) one chunk at a time"""
+    for idx, url, text in pages:
+        if not text:
+            continue
+        chunks = split(text)
+        del text
+        for chunk_idx, chunk in enumerate(chunks):
+            yield f"doc_{idx}_{chunk_idx}", chunk, ({"url": url} if with_metadata else None)
+
+
+def ingest_chunks(chunks: Iterable[Tuple[str, str, Optional[dict]]],
+                  add: Callable[..., None],
+                  embed: Optional[Callable[[List[str]], list]] = None,
+                  batch_size: int = DEFAULT_BATCH_SIZE,
+                  keep_first: int = 0) -> dict:
+    """
+    Embed and add chunks in fixed-size batches.
+    Peak memory is bounded by the batch size rather than the corpus size. The first
+    `keep_first` chunk texts are returned for callers that need a context sample.
+    """
+    chunks_added = 0
+    sample: List[str] = []
+
+    for batch in batched(chunks, batch_size):
+        ids = [chunk_id for chunk_id, _, _ in batch]
+        documents = [chunk for _, chunk, _ in batch]
+        metadatas = [metadata for _, _, metadata in batch]
+        if any(metadata is None for metadata in metadatas):
+            metadatas = None
+        embeddings = embed(documents) if embed else None
+
+        add(documents, ids, metadatas, embeddings=embeddings)
+        chunks_added += len(batch)
+        if len(sample) < keep_first:
+            sample.extend(documents[:keep_first - len(sample)])
+
+    return {"chunks_added": chunks_added, "sample": sample}
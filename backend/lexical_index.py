@@ -0,0 +1,213 @@
+# lexical_index.py
+import math
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Tokens keep dotted/dashed identifiers together (e.g. "os.path.join", "ERR-404",
+# "0x80070005") and also emit their parts, so both exact and partial matches score.
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+(?:[.\-:/][A-Za-z0-9_]+)*")
+PART_PATTERN = re.compile(r"[A-Za-z0-9]+")
+
+MAX_TERM_FREQUENCY = 65535
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase lexical terms, keeping compound identifiers"""
+    terms = []
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group(0).lower()
+        terms.append(token)
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1 or (parts and parts[0] != token):
+            terms.extend(parts)
+    return terms
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60, limit: Optional[int] = None) -> List[str]:
+    """Fuse several ranked id lists into one using reciprocal rank fusion"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    fused = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+    return fused[:limit] if limit else fused
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over RAG chunks.
+
+    Postings are stored as compact typed arrays (uint32 doc numbers, uint16 term
+    frequencies) and scored with numpy, so memory stays at a few bytes per posting.
+    Deleted chunks are tombstoned and the postings compacted once enough pile up.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, compact_ratio: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._terms: Dict[str, int] = {}
+            self._postings_docs: List[array] = []
+            self._postings_freqs: List[array] = []
+            self._doc_ids: List[Optional[str]] = []
+            self._doc_numbers: Dict[str, int] = {}
+            self._doc_lengths = array("I")
+            self._live = bytearray()
+            self._total_length = 0
+            self._deleted = 0
+
+    def __len__(self):
+        return len(self._doc_numbers)
+
+    def add(self, ids: Sequence[str], documents: Sequence[str]):
+        """Index (or re-index) the given chunks"""
+        with self._lock:
+            existing = [doc_id for doc_id in ids if doc_id in self._doc_numbers]
+            if existing:
+                self._remove(existing)
+            for doc_id, document in zip(ids, documents):
+                self._add_one(doc_id, document or "")
+            # Re-indexed chunks leave tombstones just like deleted ones
+            if existing:
+                self._maybe_compact()
+
+    def delete(self, ids: Iterable[str]):
+        """Remove the given chunk ids from the index"""
+        with self._lock:
+            self._remove(ids)
+            self._maybe_compact()
+
+    def search(self, query: str, n_results: int = 5) -> List[Tuple[str, float]]:
+        """Return up to n_results (chunk id, score) pairs ranked by BM25"""
+        with self._lock:
+            live_docs = len(self._doc_numbers)
+            if not live_docs or n_results <= 0:
+                return []
+
+            term_numbers = {self._terms[t] for t in tokenize(query) if t in self._terms}
+            if not term_numbers:
+                return []
+
+            doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)
+            avg_length = self._total_length / live_docs
+            candidates = []
+            weights = []
+
+            for term_number in term_numbers:
+                docs = np.frombuffer(self._postings_docs[term_number], dtype=np.uint32)
+                if not len(docs):
+                    continue
+                freqs = np.frombuffer(self._postings_freqs[term_number], dtype=np.uint16).astype(np.float32)
+                df = len(docs)
+                idf = math.log(1.0 + (live_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[docs] / avg_length)
+                candidates.append(docs)
+                weights.append(idf * freqs * (self.k1 + 1.0) / (freqs + norm))
+
+            if not candidates:
+                return []
+
+            # Sum per-term contributions per document. Rare terms (identifiers, error
+            # codes) touch few postings, so a sparse sum beats a dense accumulator.
+            all_docs = np.concatenate(candidates)
+            all_weights = np.concatenate(weights)
+            if len(all_docs) * 8 < len(self._doc_ids):
+                unique_docs, inverse = np.unique(all_docs, return_inverse=True)
+                totals = np.bincount(inverse, weights=all_weights)
+            else:
+                totals = np.bincount(all_docs, weights=all_weights, minlength=len(self._doc_ids))
+                unique_docs = np.flatnonzero(totals)
+                totals = totals[unique_docs]
+
+            # Tombstoned documents keep their postings until the next compaction
+            if self._deleted:
+                live_mask = np.frombuffer(self._live, dtype=np.bool_)[unique_docs]
+                unique_docs = unique_docs[live_mask]
+                totals = totals[live_mask]
+                if not len(unique_docs):
+                    return []
+
+            top = min(n_results, len(unique_docs))
+            best = np.argpartition(-totals, top - 1)[:top]
+            best = best[np.argsort(-totals[best], kind="stable")]
+            return [(self._doc_ids[unique_docs[i]], float(totals[i])) for i in best]
+
+    def _add_one(self, doc_id: str, document: str):
+        doc_number = len(self._doc_ids)
+        counts: Dict[str, int] = {}
+        for term in tokenize(document):
+            counts[term] = counts.get(term, 0) + 1
+
+        for term, count in counts.items():
+            term_number = self._terms.get(term)
+            if term_number is None:
+                term_number = len(self._postings_docs)
+                self._terms[term] = term_number
+                self._postings_docs.append(array("I"))
+                self._postings_freqs.append(array("H"))
+            self._postings_docs[term_number].append(doc_number)
+            self._postings_freqs[term_number].append(min(count, MAX_TERM_FREQUENCY))
+
+        length = sum(counts.values())
+        self._doc_ids.append(doc_id)
+        self._doc_numbers[doc_id] = doc_number
+        self._doc_lengths.append(length)
+        self._live.append(1)
+        self._total_length += length
+
+    def _remove(self, ids: Iterable[str]):
+        for doc_id in ids:
+            doc_number = self._doc_numbers.pop(doc_id, None)
+            if doc_number is None:
+                continue
+            self._doc_ids[doc_number] = None
+            self._live[doc_number] = 0
+            self._total_length -= self._doc_lengths[doc_number]
+            self._deleted += 1
+
+    def _maybe_compact(self):
+        if self._deleted > self.compact_ratio * max(len(self._doc_ids), 1):
+            self._compact()
+
+    def _compact(self):
+        """Drop tombstoned documents from every posting list and renumber"""
+        remap = array("i", [-1]) * len(self._doc_ids)
+        doc_ids: List[Optional[str]] = []
+        doc_lengths = array("I")
+        for old_number, doc_id in enumerate(self._doc_ids):
+            if doc_id is None:
+                continue
+            remap[old_number] = len(doc_ids)
+            doc_ids.append(doc_id)
+            doc_lengths.append(self._doc_lengths[old_number])
+
+        remap_np = np.frombuffer(remap, dtype=np.int32)
+        terms: Dict[str, int] = {}
+        postings_docs: List[array] = []
+        postings_freqs: List[array] = []
+        for term, term_number in self._terms.items():
+            docs = remap_np[np.frombuffer(self._postings_docs[term_number], dtype=np.uint32)]
+            keep = docs >= 0
+            if not keep.any():
+                continue
+            freqs = np.frombuffer(self._postings_freqs[term_number], dtype=np.uint16)[keep]
+            terms[term] = len(postings_docs)
+            postings_docs.append(array("I", docs[keep].astype(np.uint32).tobytes()))
+            postings_freqs.append(array("H", freqs.tobytes()))
+
+        self._terms = terms
+        self._postings_docs = postings_docs
+        self._postings_freqs = postings_freqs
+        self._doc_ids = doc_ids
+        self._doc_numbers = {doc_id: number for number, doc_id in enumerate(doc_ids)}
+        self._doc_lengths = doc_lengths
+        self._live = bytearray(b"\x01") * len(doc_ids)
+        self._deleted = 0
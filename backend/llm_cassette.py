@@ -0,0 +1,136 @@
+# llm_cassette.py
+"""
+Record/replay cassettes for DIAL calls.
+
+    DIAL_CASSETTE_MODE=record uvicorn server:app    # call DIAL, append every exchange
+    DIAL_CASSETTE_MODE=replay uvicorn server:app    # serve exchanges back, no network
+
+A cassette is a gzip-compressed JSON-lines file; each line holds the request
+hash, the upstream status, the raw response body and the observed latency.
+Requests are keyed by deployment, API version, messages and sampling
+parameters (never by URL or API key). When a key was recorded several times,
+replay cycles through the recordings in order. DIAL_CASSETTE_LATENCY=original
+sleeps for the recorded latency, "zero" answers immediately. Record with a
+single worker: the file is appended without cross-process locking.
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DIAL_CASSETTE_MODE = os.getenv("DIAL_CASSETTE_MODE", "off")
+DIAL_CASSETTE_PATH = os.getenv("DIAL_CASSETTE_PATH", "cassettes/dial.jsonl.gz")
+DIAL_CASSETTE_LATENCY = os.getenv("DIAL_CASSETTE_LATENCY", "original")
+
+CASSETTE_MODES = ("off", "record", "replay")
+LATENCY_MODES = ("original", "zero")
+
+
+class CassetteEntry(NamedTuple):
+    status: int
+    body: str
+    elapsed_ms: float
+
+
+class CassetteMiss(Exception):
+    """Replay found no recording for a request"""
+
+
+def request_key(deployment: str, api_version: str, data: dict) -> str:
+    """Stable hash of everything that determines a completion"""
+    canonical = json.dumps(
+        {"deployment": deployment, "api_version": api_version, "request": data},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    def __init__(self, path: str = DIAL_CASSETTE_PATH, mode: str = DIAL_CASSETTE_MODE,
+                 latency: str = DIAL_CASSETTE_LATENCY):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {', '.join(CASSETTE_MODES)}")
+        if latency not in LATENCY_MODES:
+            raise ValueError(f"Unknown cassette latency '{latency}', expected one of {', '.join(LATENCY_MODES)}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._entries: Dict[str, List[CassetteEntry]] = {}
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._writer = None
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette {self.path} not found; record one with DIAL_CASSETTE_MODE=record")
+        with gzip.open(self.path, "rt", encoding="utf-8") as handle:
+            try:
+                for line in handle:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._entries.setdefault(record["key"], []).append(
+                            CassetteEntry(record["status"], record["body"], record["elapsed_ms"])
+                        )
+            except EOFError:
+                # A recorder that was killed leaves the last member unterminated;
+                # everything flushed before that is still usable
+                logger.warning(f"Cassette {self.path} ends mid-stream, using the complete recordings")
+        logger.info(f"Loaded {sum(map(len, self._entries.values()))} DIAL recordings from {self.path}")
+
+    def replay(self, key: str) -> CassetteEntry:
+        """Return the next recording for key, after the recorded latency if configured"""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"No cassette recording for request {key[:16]}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+        entry = entries[position % len(entries)]
+        if self.latency == "original":
+            time.sleep(entry.elapsed_ms / 1000)
+        return entry
+
+    def record(self, key: str, status: int, body: str, elapsed_ms: float):
+        line = json.dumps({"key": key, "status": status, "body": body, "elapsed_ms": round(elapsed_ms, 3)},
+                          separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            if self._writer is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # Appending starts a new gzip member; readers see one continuous stream
+                self._writer = gzip.open(self.path, "at", encoding="utf-8")
+                atexit.register(self.close)
+            self._writer.write(line + "\n")
+            # A sync flush makes each recording durable without resetting the compressor
+            self._writer.flush()
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The cassette selected by DIAL_CASSETTE_MODE, or None when it is off"""
+    global _cassette
+    if DIAL_CASSETTE_MODE == "off":
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(DIAL_CASSETTE_PATH, DIAL_CASSETTE_MODE, DIAL_CASSETTE_LATENCY)
+    return _cassette
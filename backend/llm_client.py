@@ -0,0 +1,427 @@
+# llm_client.py
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+import tracing
+from llm_cassette import CassetteMiss, get_cassette, request_key
+from llm_resilience import (
+    DIAL_MAX_RETRIES, RETRYABLE_STATUSES, backoff_delay, get_breaker, get_latency_window, hedge_delay,
+    parse_retry_after
+)
+from model_routing import MODEL_CATALOG_PATH, ModelCatalog, ModelRouter
+
+logger = logging.getLogger(__name__)
+
+DIAL_API_KEY = os.getenv("DIAL_API_KEY")
+DIAL_API_URL = os.getenv("DIAL_API_URL", "https://ai-proxy.lab.epam.com")
+DIAL_API_VERSION = os.getenv("DIAL_API_VERSION", "2023-12-01-preview")
+DIAL_DEFAULT_DEPLOYMENT = os.getenv("DIAL_DEFAULT_DEPLOYMENT", "gpt-4o")
+DIAL_TIMEOUT_SECONDS = float(os.getenv("DIAL_TIMEOUT_SECONDS", "60"))
+DIAL_POOL_SIZE = int(os.getenv("DIAL_POOL_SIZE", "20"))
+
+
+class DialError(Exception):
+    """
+    A DIAL call that failed; status_code is the upstream status, or 502 if there was none.
+    `retryable` marks throttling, upstream and transport failures; `retry_after` is the
+    wait in seconds the upstream (or an open circuit) asked for, if any.
+    """
+
+    def __init__(self, detail: str, status_code: int = 502, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+_session: Optional[requests.Session] = None
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_router: Optional[ModelRouter] = None
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=DIAL_POOL_SIZE, pool_maxsize=DIAL_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _session = session
+    return _session
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        # Room for a primary and a hedge per pooled connection
+        _hedge_executor = ThreadPoolExecutor(max_workers=DIAL_POOL_SIZE * 2, thread_name_prefix="dial-hedge")
+    return _hedge_executor
+
+
+def list_models() -> List[dict]:
+    """The /openai/models "data" list from DIAL, or from the cassette"""
+    cassette = get_cassette()
+    key = request_key("", DIAL_API_VERSION, {"models": "/openai/models"})
+    if cassette is not None and cassette.mode == "replay":
+        entry = cassette.replay(key)
+        status, body = entry.status, entry.body
+    else:
+        started = time.perf_counter()
+        response = _get_session().get(f"{DIAL_API_URL}/openai/models", headers={"Api-Key": DIAL_API_KEY},
+                                      timeout=DIAL_TIMEOUT_SECONDS)
+        status, body = response.status_code, response.text
+        if cassette is not None and cassette.mode == "record":
+            cassette.record(key, status, body, (time.perf_counter() - started) * 1000)
+    if status != 200:
+        raise DialError(f"DIAL model list returned {status}", status_code=status)
+    return json.loads(body)["data"]
+
+
+def get_router() -> ModelRouter:
+    global _router
+    if _router is None:
+        # With a cassette the catalog comes from the cassette, never from a disk copy,
+        # so a replay routes exactly like the recording did
+        path = None if get_cassette() is not None else MODEL_CATALOG_PATH
+        _router = ModelRouter(ModelCatalog(list_models, path=path), DIAL_DEFAULT_DEPLOYMENT)
+    return _router
+
+
+def start_model_catalog():
+    """Load the model catalog before serving and keep it fresh in the background"""
+    get_router().catalog.start(wait=True)
+
+
+def chat_completion(prompt: str = None, messages: List[dict] = None, deployment: str = None,
+                    temperature: float = None, max_tokens: int = None, endpoint: str = "unknown") -> str:
+    """
+    Send a chat completion request to DIAL and return the message content.
+    `endpoint` names the calling task: it selects the deployment, max_tokens and
+    temperature from the model routing table (explicit arguments win) and labels
+    metrics and trace spans.
+    Throttling, upstream and transport failures are retried with backoff (see
+    llm_resilience). Raises DialError once retries are exhausted, on other HTTP
+    errors and malformed responses, and while the deployment's circuit is open.
+    """
+    url, headers, data, deployment = _build_request(prompt, messages, deployment, temperature, max_tokens, endpoint)
+    with tracing.span("dial.chat_completion", deployment=deployment, endpoint=endpoint) as span:
+        content, usage, retries = _post_chat_completion(url, headers, data, deployment, endpoint)
+        span.set_attribute("retries", retries)
+        span.set_attribute("prompt_tokens", usage.get("prompt_tokens", 0))
+        span.set_attribute("completion_tokens", usage.get("completion_tokens", 0))
+    return content
+
+
+def stream_chat_completion(prompt: str = None, messages: List[dict] = None, deployment: str = None,
+                           temperature: float = None, max_tokens: int = None,
+                           endpoint: str = "unknown") -> Iterator[str]:
+    """
+    Like chat_completion, but yield the content in pieces as DIAL generates it.
+    Opening the stream is retried like chat_completion; a failure after content
+    was yielded raises DialError without a retry.
+    """
+    url, headers, data, deployment = _build_request(prompt, messages, deployment, temperature, max_tokens, endpoint)
+    data["stream"] = True
+    span = tracing.start_span("dial.chat_completion", deployment=deployment, endpoint=endpoint, stream=True)
+    error = None
+    try:
+        chunks, retries = _with_retries(deployment, endpoint,
+                                        lambda: _open_stream(url, headers, data, deployment, endpoint))
+        span.set_attribute("retries", retries)
+        yield from chunks
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        tracing.finish_span(span, error)
+
+
+def _build_request(prompt: Optional[str], messages: Optional[List[dict]], deployment: Optional[str],
+                   temperature: Optional[float], max_tokens: Optional[int], endpoint: str):
+    """(url, headers, body, deployment) for a completion, with the task's route filling the gaps"""
+    route = get_router().resolve(endpoint)
+    deployment = deployment or route.deployment
+    temperature = route.temperature if temperature is None else temperature
+    max_tokens = max_tokens or route.max_tokens
+    if messages is None:
+        messages = [{"role": "user", "content": prompt}]
+    url = f"{DIAL_API_URL}/openai/deployments/{deployment}/chat/completions"
+    headers = {
+        "Content-Type": "application/json",
+        "Api-Key": DIAL_API_KEY
+    }
+    data = {
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    return url, headers, data, deployment
+
+
+def _send(url: str, headers: dict, data: dict, deployment: str):
+    """POST a completion request, or answer it from the cassette; returns (status, body text, Retry-After)"""
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        try:
+            entry = cassette.replay(request_key(deployment, DIAL_API_VERSION, data))
+        except CassetteMiss as e:
+            raise DialError(str(e))
+        return entry.status, entry.body, None
+
+    started = time.perf_counter()
+    response = _get_session().post(url, headers=headers, params={"api-version": DIAL_API_VERSION},
+                                   json=data, timeout=DIAL_TIMEOUT_SECONDS)
+    if cassette is not None and cassette.mode == "record":
+        cassette.record(request_key(deployment, DIAL_API_VERSION, data), response.status_code, response.text,
+                        (time.perf_counter() - started) * 1000)
+    return response.status_code, response.text, response.headers.get("Retry-After")
+
+
+def _post_chat_completion(url: str, headers: dict, data: dict, deployment: str, endpoint: str):
+    """Returns (content, usage, retries)"""
+    (content, usage), retries = _with_retries(
+        deployment, endpoint, lambda: _hedged_attempt(url, headers, data, deployment, endpoint)
+    )
+    return content, usage, retries
+
+
+def _with_retries(deployment: str, endpoint: str, attempt):
+    """
+    Call attempt() behind the deployment's circuit breaker, retrying retryable
+    DialErrors with jittered backoff. Returns (attempt's result, retries).
+    """
+    breaker = get_breaker(deployment)
+    retries = 0
+    while True:
+        if not breaker.allow():
+            metrics.DIAL_SHORT_CIRCUITS.labels(deployment, endpoint).inc()
+            raise DialError(f"DIAL deployment {deployment} is unavailable, retry later",
+                            status_code=503, retry_after=breaker.retry_after())
+        try:
+            result = attempt()
+        except DialError as e:
+            # Only transport errors and 5xx count against the circuit; a 4xx
+            # (throttling included) neither opens nor closes it
+            if e.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.release()
+            error = e
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result, retries
+
+        if not error.retryable or retries >= DIAL_MAX_RETRIES:
+            raise error
+        delay = backoff_delay(retries, error.retry_after)
+        if delay is None:
+            raise error
+        retries += 1
+        metrics.DIAL_RETRIES.labels(deployment, endpoint).inc()
+        logger.warning(f"Retrying DIAL {deployment} in {delay:.2f}s (retry {retries}/{DIAL_MAX_RETRIES})")
+        time.sleep(delay)
+
+
+def _hedged_attempt(url: str, headers: dict, data: dict, deployment: str, endpoint: str):
+    """
+    One attempt; when hedging is on and the call outlives the deployment's latency
+    percentile, a duplicate is sent and whichever succeeds first wins.
+    """
+    delay = hedge_delay(deployment)
+    if delay is None:
+        return _attempt(url, headers, data, deployment, endpoint)
+
+    executor = _get_hedge_executor()
+    primary = executor.submit(tracing.wrap(_attempt, "dial.attempt"), url, headers, data, deployment, endpoint)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    metrics.DIAL_HEDGES.labels(deployment, endpoint, "sent").inc()
+    hedge = executor.submit(tracing.wrap(_attempt, "dial.hedge"), url, headers, data, deployment, endpoint)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except DialError as e:
+                error = e
+                continue
+            if future is hedge:
+                metrics.DIAL_HEDGES.labels(deployment, endpoint, "won").inc()
+            _abandon(pending, deployment, endpoint)
+            return result
+    raise error
+
+
+def _abandon(futures, deployment: str, endpoint: str):
+    """
+    Drop the losing attempts of a hedge. Ones still queued are cancelled; requests
+    cannot abort a call in flight, so those run to completion in the background
+    and an upstream failure still counts against the deployment's circuit.
+    """
+    for future in futures:
+        if future.cancel():
+            metrics.DIAL_HEDGES.labels(deployment, endpoint, "cancelled").inc()
+        else:
+            future.add_done_callback(lambda f: _record_abandoned(f, deployment))
+
+
+def _record_abandoned(future, deployment: str):
+    error = future.exception()
+    if isinstance(error, DialError) and error.status_code >= 500:
+        get_breaker(deployment).record_failure()
+
+
+def _attempt(url: str, headers: dict, data: dict, deployment: str, endpoint: str):
+    started = time.perf_counter()
+    try:
+        status_code, text, retry_after = _send(url, headers, data, deployment)
+    except requests.RequestException as e:
+        metrics.observe_dial_call(deployment, endpoint, time.perf_counter() - started, error=type(e).__name__)
+        logger.error(f"DIAL request to {deployment} failed: {e}")
+        raise DialError(f"DIAL request failed: {e}", retryable=True)
+    except DialError:
+        metrics.observe_dial_call(deployment, endpoint, time.perf_counter() - started, error="cassette_miss")
+        raise
+
+    elapsed = time.perf_counter() - started
+    if status_code != 200:
+        metrics.observe_dial_call(deployment, endpoint, elapsed, error=f"http_{status_code}")
+        logger.error(f"DIAL {deployment} returned {status_code}: {text[:500]}")
+        raise DialError(text, status_code=status_code, retryable=status_code in RETRYABLE_STATUSES,
+                        retry_after=parse_retry_after(retry_after))
+
+    try:
+        body = json.loads(text)
+        content = body["choices"][0]["message"]["content"]
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        metrics.observe_dial_call(deployment, endpoint, elapsed, error="malformed_response")
+        raise DialError(f"Malformed DIAL response: {e}")
+
+    get_latency_window(deployment).add(elapsed)
+    usage = body.get("usage") or {}
+    metrics.observe_dial_call(deployment, endpoint, elapsed,
+                              prompt_tokens=usage.get("prompt_tokens", 0),
+                              completion_tokens=usage.get("completion_tokens", 0))
+    return content, usage
+
+
+def _open_stream(url: str, headers: dict, data: dict, deployment: str, endpoint: str) -> Iterator[str]:
+    """Start a streamed completion, or replay one; returns its content iterator once the status is 200"""
+    started = time.perf_counter()
+    cassette = get_cassette()
+    key = request_key(deployment, DIAL_API_VERSION, data) if cassette is not None else None
+    close = None
+    if cassette is not None and cassette.mode == "replay":
+        try:
+            entry = cassette.replay(key)
+        except CassetteMiss as e:
+            metrics.observe_dial_call(deployment, endpoint, time.perf_counter() - started, error="cassette_miss")
+            raise DialError(str(e))
+        status_code, text, retry_after = entry.status, entry.body, None
+        lines = iter(entry.body.splitlines())
+    else:
+        try:
+            response = _get_session().post(url, headers=headers, params={"api-version": DIAL_API_VERSION},
+                                           json=data, timeout=DIAL_TIMEOUT_SECONDS, stream=True)
+        except requests.RequestException as e:
+            metrics.observe_dial_call(deployment, endpoint, time.perf_counter() - started, error=type(e).__name__)
+            logger.error(f"DIAL request to {deployment} failed: {e}")
+            raise DialError(f"DIAL request failed: {e}", retryable=True)
+        status_code, retry_after = response.status_code, response.headers.get("Retry-After")
+        if status_code == 200:
+            text, lines, close = "", _iter_stream_lines(response), response.close
+        else:
+            text = response.text
+            if cassette is not None and cassette.mode == "record":
+                cassette.record(key, status_code, text, (time.perf_counter() - started) * 1000)
+
+    if status_code != 200:
+        metrics.observe_dial_call(deployment, endpoint, time.perf_counter() - started, error=f"http_{status_code}")
+        logger.error(f"DIAL {deployment} returned {status_code}: {text[:500]}")
+        raise DialError(text, status_code=status_code, retryable=status_code in RETRYABLE_STATUSES,
+                        retry_after=parse_retry_after(retry_after))
+    recorder = cassette if cassette is not None and cassette.mode == "record" else None
+    return _read_stream(lines, deployment, endpoint, started, recorder, key, close)
+
+
+def _iter_stream_lines(response: requests.Response) -> Iterator[str]:
+    """
+    Lines of a streamed response as soon as each arrives; iter_lines blocks
+    until a whole chunk_size block is read, which batches up events.
+    """
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:  # urllib3 < 2
+        yield from response.iter_lines(chunk_size=64, decode_unicode=True)
+        return
+    buffer = b""
+    while True:
+        data = read1(8192, decode_content=True)
+        if not data:
+            break
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8")
+    if buffer:
+        yield buffer.decode("utf-8")
+
+
+def _read_stream(lines, deployment: str, endpoint: str, started: float, recorder=None, key: str = None,
+                 close=None) -> Iterator[str]:
+    """Yield content deltas from DIAL's server-sent events; the call is observed when the stream ends"""
+    raw = []
+    usage = {}
+    error = None
+    finished = False
+    try:
+        for line in lines:
+            raw.append(line)
+            if not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                break
+            try:
+                chunk = json.loads(payload)
+            except ValueError as e:
+                error = "malformed_response"
+                raise DialError(f"Malformed DIAL stream chunk: {e}")
+            usage = chunk.get("usage") or usage
+            for choice in chunk.get("choices") or []:
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    yield content
+        finished = True
+    except requests.RequestException as e:
+        error = type(e).__name__
+        logger.error(f"DIAL stream from {deployment} interrupted: {e}")
+        raise DialError(f"DIAL stream interrupted: {e}")
+    finally:
+        if close is not None:
+            close()
+        elapsed = time.perf_counter() - started
+        if not finished and error is None:
+            # The consumer stopped reading, e.g. the client disconnected
+            error = "cancelled"
+        metrics.observe_dial_call(deployment, endpoint, elapsed, error=error,
+                                  prompt_tokens=usage.get("prompt_tokens", 0),
+                                  completion_tokens=usage.get("completion_tokens", 0))
+        if recorder is not None and finished:
+            recorder.record(key, 200, "\n".join(raw), elapsed * 1000)
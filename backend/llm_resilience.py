@@ -0,0 +1,176 @@
+# llm_resilience.py
+"""
+Retry, circuit breaker and hedging policy for DIAL calls.
+
+    DIAL_MAX_RETRIES=2              # extra attempts after a 408/429/5xx or transport error
+    DIAL_BACKOFF_BASE_SECONDS=0.5   # full-jitter exponential backoff: uniform(0, base * 2**attempt)
+    DIAL_BACKOFF_MAX_SECONDS=8      # cap on one wait; a longer Retry-After fails fast instead
+    DIAL_BREAKER_FAILURES=5         # consecutive upstream failures that open a deployment's circuit
+    DIAL_BREAKER_RESET_SECONDS=30   # how long an open circuit rejects calls before one probe
+    DIAL_HEDGE_PERCENTILE=0         # e.g. 95: send a duplicate once a call is slower than p95 (0 = off)
+
+State is per process and per deployment. Hedging needs DIAL_HEDGE_MIN_SAMPLES
+successful calls before it starts, and each hedge spends a second completion:
+the losing call cannot be aborted once sent, so it keeps a hedge thread and a
+DIAL connection until it finishes. At p95 that is up to ~5% more DIAL calls and
+tokens than the rate limiter's estimates charge for.
+"""
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DIAL_MAX_RETRIES = int(os.getenv("DIAL_MAX_RETRIES", "2"))
+DIAL_BACKOFF_BASE_SECONDS = float(os.getenv("DIAL_BACKOFF_BASE_SECONDS", "0.5"))
+DIAL_BACKOFF_MAX_SECONDS = float(os.getenv("DIAL_BACKOFF_MAX_SECONDS", "8"))
+DIAL_BREAKER_FAILURES = int(os.getenv("DIAL_BREAKER_FAILURES", "5"))
+DIAL_BREAKER_RESET_SECONDS = float(os.getenv("DIAL_BREAKER_RESET_SECONDS", "30"))
+DIAL_HEDGE_PERCENTILE = float(os.getenv("DIAL_HEDGE_PERCENTILE", "0"))
+DIAL_HEDGE_MIN_SAMPLES = int(os.getenv("DIAL_HEDGE_MIN_SAMPLES", "20"))
+DIAL_HEDGE_WINDOW = int(os.getenv("DIAL_HEDGE_WINDOW", "200"))
+
+# Statuses worth another attempt: timeouts, throttling and upstream failures
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+    """
+    Wait before retry number `attempt` (0-based): full jitter, never shorter than
+    Retry-After. None when the server asks for longer than DIAL_BACKOFF_MAX_SECONDS.
+    """
+    if retry_after is not None and retry_after > DIAL_BACKOFF_MAX_SECONDS:
+        return None
+    delay = random.uniform(0, min(DIAL_BACKOFF_MAX_SECONDS, DIAL_BACKOFF_BASE_SECONDS * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive upstream failures and rejects
+    calls for `reset_timeout` seconds, then lets a single probe through
+    (half-open); the probe's outcome closes or re-opens the circuit. Every
+    allow() must be followed by record_success(), record_failure() or release()
+    on the same thread.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = DIAL_BREAKER_FAILURES,
+                 reset_timeout: float = DIAL_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        # Thread running the half-open probe, if any
+        self._probe_thread: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probe_thread = None
+            if self.state == HALF_OPEN and self._probe_thread is None:
+                self._probe_thread = threading.get_ident()
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit admits its next probe"""
+        with self._lock:
+            return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = CLOSED
+            self.failures = 0
+            self._probe_thread = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probe_thread = None
+
+    def release(self):
+        """End a call whose outcome says nothing about upstream health; frees this thread's probe"""
+        with self._lock:
+            if self._probe_thread == threading.get_ident():
+                self._probe_thread = None
+
+
+class LatencyWindow:
+    """Recent successful call latencies, for the hedging threshold"""
+
+    def __init__(self, size: int = DIAL_HEDGE_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = DIAL_HEDGE_MIN_SAMPLES) -> Optional[float]:
+        """Nearest-rank percentile, or None until min_samples latencies were seen"""
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            values = sorted(self._samples)
+        return values[min(max(math.ceil(q / 100 * len(values)) - 1, 0), len(values) - 1)]
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[str, LatencyWindow] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(deployment: str) -> CircuitBreaker:
+    with _registry_lock:
+        if deployment not in _breakers:
+            _breakers[deployment] = CircuitBreaker(deployment)
+        return _breakers[deployment]
+
+
+def get_latency_window(deployment: str) -> LatencyWindow:
+    with _registry_lock:
+        if deployment not in _latencies:
+            _latencies[deployment] = LatencyWindow()
+        return _latencies[deployment]
+
+
+def hedge_delay(deployment: str) -> Optional[float]:
+    """Seconds after which a duplicate request is sent, or None when hedging is off or still warming up"""
+    if DIAL_HEDGE_PERCENTILE <= 0:
+        return None
+    return get_latency_window(deployment).percentile(DIAL_HEDGE_PERCENTILE)
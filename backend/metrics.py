@@ -0,0 +1,156 @@
+# metrics.py
+"""
+Prometheus metrics for the API.
+
+Served by GET /metrics. With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR
+to an empty directory so every worker's samples are aggregated; cache
+statistics then describe the worker that served the scrape.
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from starlette.responses import Response
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Upstream LLM calls take seconds, so they get wider buckets than HTTP requests
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+SQL_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"]
+)
+DIAL_REQUEST_DURATION = Histogram(
+    "dial_request_duration_seconds", "DIAL chat completion latency", ["deployment", "endpoint"],
+    buckets=LLM_BUCKETS
+)
+DIAL_REQUESTS = Counter("dial_requests_total", "DIAL chat completion calls", ["deployment", "endpoint"])
+DIAL_ERRORS = Counter("dial_errors_total", "Failed DIAL chat completion calls", ["deployment", "endpoint", "reason"])
+DIAL_RETRIES = Counter("dial_retries_total", "DIAL calls retried after a retryable failure", ["deployment", "endpoint"])
+DIAL_HEDGES = Counter("dial_hedges_total", "Hedged duplicate DIAL calls", ["deployment", "endpoint", "outcome"])
+DIAL_SHORT_CIRCUITS = Counter(
+    "dial_short_circuits_total", "DIAL calls rejected by an open circuit breaker", ["deployment", "endpoint"]
+)
+DIAL_TOKENS = Counter("dial_tokens_total", "Tokens reported by DIAL", ["deployment", "endpoint", "kind"])
+RATE_LIMITED = Counter("rate_limit_rejections_total", "Requests rejected by admission control", ["endpoint"])
+CHROMA_DURATION = Histogram("chroma_operation_duration_seconds", "Chroma collection call latency", ["operation"])
+SQL_QUERIES = Counter("sql_queries_total", "SQL statements executed", ["route"])
+SQL_QUERIES_PER_REQUEST = Histogram(
+    "sql_queries_per_request", "SQL statements executed per HTTP request", ["route"], buckets=SQL_QUERY_BUCKETS
+)
+
+# Per-request SQL statement counter; a one-element list so threadpool copies of
+# the context still increment the request's own count
+_sql_query_count: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("sql_query_count", default=None)
+
+_caches: Dict[str, object] = {}
+
+
+def observe_dial_call(deployment: str, endpoint: str, seconds: float, error: str = None,
+                      prompt_tokens: int = 0, completion_tokens: int = 0):
+    DIAL_REQUESTS.labels(deployment, endpoint).inc()
+    DIAL_REQUEST_DURATION.labels(deployment, endpoint).observe(seconds)
+    if error is not None:
+        DIAL_ERRORS.labels(deployment, endpoint, error).inc()
+    if prompt_tokens:
+        DIAL_TOKENS.labels(deployment, endpoint, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        DIAL_TOKENS.labels(deployment, endpoint, "completion").inc(completion_tokens)
+
+
+@contextmanager
+def chroma_timer(operation: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        CHROMA_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+
+def _count_sql_query(conn, cursor, statement, parameters, context, executemany):
+    count = _sql_query_count.get()
+    if count is not None:
+        count[0] += 1
+
+
+def instrument_engine(engine):
+    """Count statements executed on the engine against the current request"""
+    event.listen(engine, "before_cursor_execute", _count_sql_query)
+
+
+class CacheCollector:
+    """Exports hits, misses and hit ratio of registered LRUCache instances at scrape time"""
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits_total", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses_total", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        for name, cache in _caches.items():
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            ratio.add_metric([name], cache.hit_ratio)
+        return [hits, misses, ratio]
+
+
+def register_cache(name: str, cache):
+    if not _caches and not MULTIPROCESS:
+        REGISTRY.register(CacheCollector())
+    _caches[name] = cache
+
+
+def metrics_response() -> Response:
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(CacheCollector())
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+class PrometheusMiddleware:
+    """Records latency per route template and status, and SQL statements per request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        sql_count = [0]
+        token = _sql_query_count.set(sql_count)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _sql_query_count.reset(token)
+            route = scope.get("route")
+            # Label by route template, not raw path, to keep cardinality bounded
+            route_label = getattr(route, "path", None) or "unmatched"
+            if route_label != "/metrics":
+                HTTP_REQUEST_DURATION.labels(scope["method"], route_label, str(status_code)).observe(
+                    time.perf_counter() - started
+                )
+                SQL_QUERIES_PER_REQUEST.labels(route_label).observe(sql_count[0])
+                if sql_count[0]:
+                    SQL_QUERIES.labels(route_label).inc(sql_count[0])
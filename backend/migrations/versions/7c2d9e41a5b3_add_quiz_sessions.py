@@ -0,0 +1,45 @@
+"""Add quiz_sessions table
+
+Revision ID: 7c2d9e41a5b3
+Revises: 44e4b59fff02
+Create Date: 2026-10-19 10:05:12.481203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d9e41a5b3'
+down_revision: Union[str, None] = '44e4b59fff02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('quiz_sessions',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('questions', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_accessed', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_quiz_sessions_id'), 'quiz_sessions', ['id'], unique=False)
+    op.create_index(op.f('ix_quiz_sessions_user_id'), 'quiz_sessions', ['user_id'], unique=False)
+    op.create_index(op.f('ix_quiz_sessions_last_accessed'), 'quiz_sessions', ['last_accessed'], unique=False)
+    op.create_index(op.f('ix_quiz_sessions_expires_at'), 'quiz_sessions', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_quiz_sessions_expires_at'), table_name='quiz_sessions')
+    op.drop_index(op.f('ix_quiz_sessions_last_accessed'), table_name='quiz_sessions')
+    op.drop_index(op.f('ix_quiz_sessions_user_id'), table_name='quiz_sessions')
+    op.drop_index(op.f('ix_quiz_sessions_id'), table_name='quiz_sessions')
+    op.drop_table('quiz_sessions')
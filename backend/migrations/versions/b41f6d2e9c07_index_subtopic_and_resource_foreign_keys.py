@@ -0,0 +1,30 @@
+"""Index subtopic and resource foreign keys
+
+Revision ID: b41f6d2e9c07
+Revises: 7c2d9e41a5b3
+Create Date: 2026-10-19 13:20:41.906114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f6d2e9c07'
+down_revision: Union[str, None] = '7c2d9e41a5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_subtopics_learning_path_id'), 'subtopics', ['learning_path_id'], unique=False)
+    op.create_index(op.f('ix_resources_subtopic_id'), 'resources', ['subtopic_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_resources_subtopic_id'), table_name='resources')
+    op.drop_index(op.f('ix_subtopics_learning_path_id'), table_name='subtopics')
@@ -0,0 +1,39 @@
+"""Add subtopic position
+
+Revision ID: e93a1c5b7f24
+Revises: b41f6d2e9c07
+Create Date: 2026-10-19 13:31:07.552318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e93a1c5b7f24'
+down_revision: Union[str, None] = 'b41f6d2e9c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('subtopics', sa.Column('position', sa.Integer(), nullable=True))
+    # Number each path's subtopics 1..n in insertion (id) order, the order the
+    # detail endpoint used to index into
+    op.execute(
+        "UPDATE subtopics SET position = ("
+        "SELECT COUNT(*) FROM subtopics AS earlier "
+        "WHERE earlier.learning_path_id = subtopics.learning_path_id AND earlier.id <= subtopics.id"
+        ")"
+    )
+    op.create_index('ix_subtopics_learning_path_id_position', 'subtopics', ['learning_path_id', 'position'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_subtopics_learning_path_id_position', table_name='subtopics')
+    with op.batch_alter_table('subtopics') as batch_op:
+        batch_op.drop_column('position')
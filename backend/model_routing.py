@@ -0,0 +1,179 @@
+# model_routing.py
+"""
+Per-task model routing backed by a cached DIAL model catalog.
+
+Each LLM task (the `endpoint` passed to llm_client.chat_completion) maps to a
+deployment, max_tokens and temperature. Override any part of the table with
+JSON in MODEL_ROUTES:
+
+    MODEL_ROUTES='{"ask": {"deployment": "gpt-4o"}, "submit_answers": {"max_tokens": 300}}'
+
+The catalog of deployments from /openai/models is cached in MODEL_CATALOG_PATH
+and refetched by a background thread every MODEL_CATALOG_REFRESH_SECONDS, so
+requests never wait for it. A routed deployment missing from the catalog falls
+back to DIAL_DEFAULT_DEPLOYMENT; when the catalog cannot be fetched and no
+cached copy exists, routes are used unchecked.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+MODEL_CATALOG_PATH = os.getenv("MODEL_CATALOG_PATH", "model_catalog.json")
+MODEL_CATALOG_REFRESH_SECONDS = float(os.getenv("MODEL_CATALOG_REFRESH_SECONDS", "86400"))
+# After a failed fetch, wait this long (at most) before trying again
+MODEL_CATALOG_RETRY_SECONDS = 300
+MODEL_ROUTES = os.getenv("MODEL_ROUTES", "")
+
+
+class Route(NamedTuple):
+    deployment: str
+    max_tokens: int
+    temperature: float
+
+
+# Long-form generation stays on the strongest model; short, latency-sensitive
+# answers and grading go to the faster one. Grading is deterministic. Ids are
+# DIAL deployment ids as listed by /openai/models (see model_details.txt).
+DEFAULT_ROUTES: Dict[str, Route] = {
+    "submit_topic": Route("gpt-4o", 1500, 0.7),
+    "detailed_subtopic": Route("gpt-4o", 1000, 0.7),
+    "ask": Route("gpt-4o-mini-2024-07-18", 1000, 0.3),
+    "generate_quiz": Route("gpt-4o-mini-2024-07-18", 1000, 0.7),
+    "submit_answers": Route("gpt-4o-mini-2024-07-18", 300, 0.0),
+}
+
+
+def load_routes(overrides: str = MODEL_ROUTES) -> Dict[str, Route]:
+    """DEFAULT_ROUTES merged with the JSON overrides"""
+    routes = dict(DEFAULT_ROUTES)
+    if not overrides:
+        return routes
+    try:
+        parsed = json.loads(overrides)
+    except ValueError as e:
+        raise ValueError(f"MODEL_ROUTES is not valid JSON: {e}")
+    for task, fields in parsed.items():
+        base = routes.get(task, Route("", 1000, 0.7))
+        unknown = set(fields) - set(Route._fields)
+        if unknown:
+            raise ValueError(f"Unknown MODEL_ROUTES fields for {task}: {', '.join(sorted(unknown))}")
+        routes[task] = base._replace(**fields)
+    return routes
+
+
+class ModelCatalog:
+    """
+    Chat-capable deployment ids, fetched with `fetch` (which returns the
+    /openai/models "data" list) and cached on disk between processes.
+    With path=None nothing is read from or written to disk.
+    """
+
+    def __init__(self, fetch: Callable[[], List[dict]], path: Optional[str] = MODEL_CATALOG_PATH,
+                 refresh_seconds: float = MODEL_CATALOG_REFRESH_SECONDS):
+        self.fetch = fetch
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._deployments: Optional[Set[str]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                cached = json.load(handle)
+            self._deployments = set(cached["deployments"])
+            self._fetched_at = float(cached["fetched_at"])
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable model catalog {self.path}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"fetched_at": self._fetched_at, "deployments": sorted(self._deployments)}, handle, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        models = self.fetch()
+        self._deployments = {
+            model["id"] for model in models
+            if model.get("capabilities", {}).get("chat_completion", True)
+        }
+        self._fetched_at = time.time()
+        self._save()
+        logger.info(f"Model catalog refreshed: {len(self._deployments)} chat deployments")
+
+    def _try_refresh(self) -> float:
+        """Refresh, keeping the cached copy on failure; returns the seconds until the next refresh"""
+        try:
+            self.refresh()
+            return self.refresh_seconds
+        except Exception as e:
+            logger.warning(f"Model catalog refresh failed, using cached copy: {e}")
+            return min(self.refresh_seconds, MODEL_CATALOG_RETRY_SECONDS)
+
+    def start(self, wait: bool = False):
+        """
+        Start the background refresher. With wait=True and no cached copy, the first
+        fetch happens before returning (for application startup).
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            if wait and self._deployments is None:
+                delay = self._try_refresh()
+            else:
+                delay = max(self._fetched_at + self.refresh_seconds - time.time(), 0.0)
+            self._thread = threading.Thread(target=self._run, args=(delay,), name="model-catalog", daemon=True)
+            self._thread.start()
+
+    def _run(self, delay: float):
+        while not self._stop.wait(delay):
+            delay = self._try_refresh()
+
+    def stop(self):
+        self._stop.set()
+
+    def deployments(self) -> Optional[Set[str]]:
+        """Known deployments as last fetched; None when the catalog is unavailable"""
+        if self._thread is None:
+            self.start()
+        return self._deployments
+
+
+class ModelRouter:
+    def __init__(self, catalog: Optional[ModelCatalog], default_deployment: str,
+                 routes: Dict[str, Route] = None):
+        self.catalog = catalog
+        self.default_deployment = default_deployment
+        self.routes = routes if routes is not None else load_routes()
+        self._warned: Set[str] = set()
+
+    def resolve(self, task: str) -> Route:
+        """The route for task, on the default deployment if its own is not in the catalog"""
+        route = self.routes.get(task) or Route(self.default_deployment, 1000, 0.7)
+        if not route.deployment:
+            return route._replace(deployment=self.default_deployment)
+        known = self.catalog.deployments() if self.catalog is not None else None
+        if known is not None and route.deployment not in known:
+            if route.deployment not in self._warned:
+                self._warned.add(route.deployment)
+                logger.warning(f"Deployment {route.deployment} for {task} is not in the model catalog, "
+                               f"using {self.default_deployment}")
+            return route._replace(deployment=self.default_deployment)
+        return route
@@ -0,0 +1,182 @@
+# quiz_sessions.py
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from database import SessionLocal, QuizSession
+
+# Quiz sessions expire after the TTL; each user keeps at most QUIZ_SESSIONS_PER_USER
+# (least recently used evicted first) and the SQL store at most QUIZ_SESSIONS_MAX overall
+QUIZ_SESSION_BACKEND = os.getenv("QUIZ_SESSION_BACKEND", "sqlite")
+QUIZ_SESSION_TTL_SECONDS = int(os.getenv("QUIZ_SESSION_TTL_SECONDS", str(24 * 3600)))
+QUIZ_SESSIONS_PER_USER = int(os.getenv("QUIZ_SESSIONS_PER_USER", "5"))
+QUIZ_SESSIONS_MAX = int(os.getenv("QUIZ_SESSIONS_MAX", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class QuizSessionStore(ABC):
+    """Storage for generated quizzes, shared by every API worker"""
+
+    @abstractmethod
+    def create(self, user_id: int, questions: List[str]) -> str:
+        """Store the questions and return the new session id"""
+
+    @abstractmethod
+    def get(self, session_id: str, user_id: int) -> Optional[List[str]]:
+        """Questions of a live session owned by the user, or None"""
+
+    @abstractmethod
+    def latest(self, user_id: int) -> Optional[Tuple[str, List[str]]]:
+        """(session id, questions) of the user's most recently used live session"""
+
+
+class SQLQuizSessionStore(QuizSessionStore):
+    """Quiz sessions in the application's SQLite database"""
+
+    def __init__(self, session_factory=SessionLocal, ttl_seconds: int = QUIZ_SESSION_TTL_SECONDS,
+                 per_user: int = QUIZ_SESSIONS_PER_USER, max_sessions: int = QUIZ_SESSIONS_MAX):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.per_user = per_user
+        self.max_sessions = max_sessions
+
+    def create(self, user_id: int, questions: List[str]) -> str:
+        now = datetime.utcnow()
+        session_id = str(uuid.uuid4())
+        db = self.session_factory()
+        try:
+            db.add(QuizSession(
+                id=session_id,
+                user_id=user_id,
+                questions=json.dumps(questions),
+                created_at=now,
+                last_accessed=now,
+                expires_at=now + timedelta(seconds=self.ttl_seconds)
+            ))
+            db.flush()
+            self._evict(db, user_id, now)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return session_id
+
+    def _evict(self, db, user_id: int, now: datetime):
+        db.query(QuizSession).filter(QuizSession.expires_at <= now).delete(synchronize_session=False)
+
+        stale_for_user = db.query(QuizSession.id).filter(
+            QuizSession.user_id == user_id
+        ).order_by(QuizSession.last_accessed.desc()).offset(self.per_user).all()
+        stale_overall = db.query(QuizSession.id).order_by(
+            QuizSession.last_accessed.desc()
+        ).offset(self.max_sessions).all()
+
+        stale_ids = {row.id for row in stale_for_user} | {row.id for row in stale_overall}
+        if stale_ids:
+            db.query(QuizSession).filter(QuizSession.id.in_(stale_ids)).delete(synchronize_session=False)
+
+    def _touch(self, db, session: QuizSession) -> List[str]:
+        session.last_accessed = datetime.utcnow()
+        db.commit()
+        return json.loads(session.questions)
+
+    def get(self, session_id: str, user_id: int) -> Optional[List[str]]:
+        db = self.session_factory()
+        try:
+            session = db.query(QuizSession).filter(
+                QuizSession.id == session_id,
+                QuizSession.user_id == user_id,
+                QuizSession.expires_at > datetime.utcnow()
+            ).first()
+            return self._touch(db, session) if session else None
+        finally:
+            db.close()
+
+    def latest(self, user_id: int) -> Optional[Tuple[str, List[str]]]:
+        db = self.session_factory()
+        try:
+            session = db.query(QuizSession).filter(
+                QuizSession.user_id == user_id,
+                QuizSession.expires_at > datetime.utcnow()
+            ).order_by(QuizSession.last_accessed.desc()).first()
+            return (session.id, self._touch(db, session)) if session else None
+        finally:
+            db.close()
+
+
+class RedisQuizSessionStore(QuizSessionStore):
+    """
+    Quiz sessions in Redis (or any server speaking its protocol).
+    Each session is a key with a TTL; a per-user sorted set scored by last access
+    provides the LRU order. Global memory bounds are left to Redis' maxmemory policy.
+    """
+
+    def __init__(self, url: str = REDIS_URL, ttl_seconds: int = QUIZ_SESSION_TTL_SECONDS,
+                 per_user: int = QUIZ_SESSIONS_PER_USER, client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.per_user = per_user
+
+    @staticmethod
+    def _session_key(session_id: str) -> str:
+        return f"quiz:session:{session_id}"
+
+    @staticmethod
+    def _user_key(user_id: int) -> str:
+        return f"quiz:user:{user_id}"
+
+    def create(self, user_id: int, questions: List[str]) -> str:
+        session_id = str(uuid.uuid4())
+        user_key = self._user_key(user_id)
+        pipe = self.client.pipeline()
+        pipe.set(self._session_key(session_id), json.dumps({"user_id": user_id, "questions": questions}),
+                 ex=self.ttl_seconds)
+        pipe.zadd(user_key, {session_id: time.time()})
+        pipe.expire(user_key, self.ttl_seconds)
+        pipe.execute()
+
+        evicted = self.client.zrange(user_key, 0, -(self.per_user + 1))
+        if evicted:
+            pipe = self.client.pipeline()
+            pipe.zrem(user_key, *evicted)
+            pipe.delete(*[self._session_key(evicted_id) for evicted_id in evicted])
+            pipe.execute()
+        return session_id
+
+    def get(self, session_id: str, user_id: int) -> Optional[List[str]]:
+        raw = self.client.get(self._session_key(session_id))
+        if raw is None:
+            self.client.zrem(self._user_key(user_id), session_id)
+            return None
+        data = json.loads(raw)
+        if data["user_id"] != user_id:
+            return None
+        self.client.zadd(self._user_key(user_id), {session_id: time.time()})
+        return data["questions"]
+
+    def latest(self, user_id: int) -> Optional[Tuple[str, List[str]]]:
+        for session_id in self.client.zrevrange(self._user_key(user_id), 0, -1):
+            questions = self.get(session_id, user_id)
+            if questions is not None:
+                return session_id, questions
+        return None
+
+
+def create_quiz_session_store(backend: str = None) -> QuizSessionStore:
+    """Build the store selected by QUIZ_SESSION_BACKEND ("sqlite" or "redis")"""
+    backend = backend or QUIZ_SESSION_BACKEND
+    if backend == "redis":
+        return RedisQuizSessionStore()
+    if backend == "sqlite":
+        return SQLQuizSessionStore()
+    raise ValueError(f"Unknown quiz session backend '{backend}', expected 'sqlite' or 'redis'")
@@ -0,0 +1,130 @@
+# rag_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = " ?!.;:"
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different phrasings share a cache entry"""
+    return _WHITESPACE.sub(" ", question).strip().strip(_TRAILING_PUNCTUATION).lower()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional time-to-live per entry"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CollectionVersion:
+    """Monotonic version of the RAG collection contents.
+
+    Every write to the collection bumps it, and cache keys include it, so entries
+    computed against older contents can never be served again.
+    """
+
+    def __init__(self, initial: int = 0):
+        self._value = initial
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class ChromaCollectionVersion:
+    """Collection version kept in the Chroma collection's own metadata.
+
+    Every worker on the same persist directory reads and writes the same value,
+    so a write through one worker invalidates the caches of all of them. Versions
+    are nanosecond timestamps rather than a counter, so two workers bumping at
+    once still move past every version either of them saw before.
+
+    `current` is re-read from Chroma at most every `ttl_seconds`, so another
+    worker's write is seen up to that late; this worker's own bumps are seen at once.
+    """
+
+    KEY = "version"
+
+    def __init__(self, client, name: str, ttl_seconds: float = 1.0):
+        self.client = client
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self._cached: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> int:
+        cached = self._cached
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        return self.read()
+
+    def read(self) -> int:
+        """The version as stored in Chroma right now, bypassing the cache"""
+        metadata = self.client.get_collection(self.name).metadata or {}
+        return self._remember(int(metadata.get(self.KEY, 0)))
+
+    def _remember(self, version: int) -> int:
+        with self._lock:
+            self._cached = (version, time.monotonic() + self.ttl_seconds)
+        return version
+
+    def bump(self) -> int:
+        collection = self.client.get_collection(self.name)
+        # hnsw:* settings cannot be changed after creation, so they are not resent
+        metadata = {key: value for key, value in (collection.metadata or {}).items()
+                    if not key.startswith("hnsw:")}
+        metadata[self.KEY] = max(time.time_ns(), int(metadata.get(self.KEY, 0)) + 1)
+        collection.modify(metadata=metadata)
+        return self._remember(metadata[self.KEY])
@@ -0,0 +1,162 @@
+# rate_limits.py
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Token buckets in front of the LLM-backed endpoints. Each request must fit
+# into four buckets at once: the user's and the global request rate, and the
+# user's and the global estimated LLM token rate. Capacities are per minute
+# and double as the burst size. The per-user token budget must hold the
+# largest batch the API accepts in one request (64 asks x 2500 tokens by
+# default); a batch that can never fit is rejected with 413.
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+USER_REQUESTS_PER_MINUTE = float(os.getenv("USER_REQUESTS_PER_MINUTE", "30"))
+USER_TOKENS_PER_MINUTE = float(os.getenv("USER_TOKENS_PER_MINUTE", "160000"))
+GLOBAL_REQUESTS_PER_MINUTE = float(os.getenv("GLOBAL_REQUESTS_PER_MINUTE", "600"))
+GLOBAL_TOKENS_PER_MINUTE = float(os.getenv("GLOBAL_TOKENS_PER_MINUTE", "1000000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Estimated prompt + completion tokens per LLM call, by endpoint
+ESTIMATED_TOKENS = {
+    "submit_topic": 2000,
+    "detailed_subtopic": 1300,
+    "ask": 2500,
+    "generate_quiz": 2500,
+    "submit_answers": 400,
+}
+
+
+class Bucket(NamedTuple):
+    key: str
+    capacity: float
+    refill_per_second: float
+    cost: float
+
+
+class RateLimiter(ABC):
+    """Token bucket state, shared by every API worker when backed by Redis"""
+
+    @abstractmethod
+    def acquire(self, buckets: List[Bucket]) -> float:
+        """
+        Take `cost` from every bucket, or from none of them.
+        Returns 0 when admitted, else the seconds until all buckets could admit.
+        A bucket whose cost exceeds its capacity never admits; check oversized() first.
+        """
+
+
+def _refill(tokens: float, updated: float, now: float, bucket: Bucket) -> float:
+    return min(bucket.capacity, tokens + max(now - updated, 0.0) * bucket.refill_per_second)
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Buckets in process memory; limits apply per worker"""
+
+    def __init__(self):
+        self._state: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, buckets: List[Bucket]) -> float:
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for bucket in buckets:
+                tokens, updated = self._state.get(bucket.key, (bucket.capacity, now))
+                tokens = _refill(tokens, updated, now, bucket)
+                levels.append(tokens)
+                if tokens < bucket.cost:
+                    wait = max(wait, (bucket.cost - tokens) / bucket.refill_per_second)
+            if wait > 0:
+                return wait
+            for bucket, tokens in zip(buckets, levels):
+                self._state[bucket.key] = (tokens - bucket.cost, now)
+            return 0.0
+
+
+# KEYS: bucket keys; ARGV: now, then capacity, refill per second and cost per key
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local levels = {}
+local wait = 0
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[i * 3 - 1])
+    local rate = tonumber(ARGV[i * 3])
+    local cost = tonumber(ARGV[i * 3 + 1])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(now - updated, 0) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[i * 3 - 1])
+    local rate = tonumber(ARGV[i * 3])
+    local cost = tonumber(ARGV[i * 3 + 1])
+    redis.call('HSET', KEYS[i], 'tokens', tostring(levels[i] - cost), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) + 1)
+end
+return '0'
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Buckets in Redis (or any server speaking its protocol), updated atomically
+    by one Lua script so limits hold across all API workers.
+    """
+
+    def __init__(self, url: str = REDIS_URL, client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self._script = client.register_script(_ACQUIRE_SCRIPT)
+
+    def acquire(self, buckets: List[Bucket]) -> float:
+        args = [time.time()]
+        for bucket in buckets:
+            args.extend([bucket.capacity, bucket.refill_per_second, bucket.cost])
+        return float(self._script(keys=[f"ratelimit:{bucket.key}" for bucket in buckets], args=args))
+
+
+def endpoint_buckets(user_id: int, endpoint: str, calls: int = 1) -> List[Bucket]:
+    """Buckets charged for `calls` LLM calls made by one request to `endpoint`"""
+    tokens = ESTIMATED_TOKENS.get(endpoint, 1000) * calls
+    specs = [
+        (f"user:{user_id}:requests", USER_REQUESTS_PER_MINUTE, 1),
+        (f"user:{user_id}:tokens", USER_TOKENS_PER_MINUTE, tokens),
+        ("global:requests", GLOBAL_REQUESTS_PER_MINUTE, 1),
+        ("global:tokens", GLOBAL_TOKENS_PER_MINUTE, tokens),
+    ]
+    return [Bucket(key, capacity, capacity / 60.0, cost) for key, capacity, cost in specs]
+
+
+def oversized(buckets: List[Bucket]) -> Optional[Bucket]:
+    """The first bucket the request could never fit into, even when full"""
+    return next((bucket for bucket in buckets if bucket.cost > bucket.capacity), None)
+
+
+def retry_after_header(wait_seconds: float) -> str:
+    return str(max(math.ceil(wait_seconds), 1))
+
+
+def create_rate_limiter(backend: str = None) -> RateLimiter:
+    """Build the limiter selected by RATE_LIMIT_BACKEND ("memory" or "redis")"""
+    backend = backend or RATE_LIMIT_BACKEND
+    if backend == "redis":
+        return RedisRateLimiter()
+    if backend == "memory":
+        return MemoryRateLimiter()
+    raise ValueError(f"Unknown rate limit backend '{backend}', expected 'memory' or 'redis'")
@@ -0,0 +1,85 @@
+# responses.py
+import json
+import os
+from typing import Any
+
+import anyio.to_thread
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware, IdentityResponder
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is used when it is missing
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# Larger bodies are compressed in a worker thread instead of on the event loop
+COMPRESSION_THREAD_MINIMUM_SIZE = 128 * 1024
+# Streamed line by line; compressing would hold lines back in the encoder's buffer
+EXCLUDED_CONTENT_TYPES = DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/x-ndjson",)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int = BROTLI_QUALITY):
+        super().__init__(app, minimum_size, exclude_content_types=EXCLUDED_CONTENT_TYPES)
+        self.quality = quality
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= COMPRESSION_THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        if more_body:
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.process(body) + self._compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses of at least `minimum_size` bytes.
+    Brotli is preferred when the client accepts it and the brotli package is
+    installed; otherwise gzip is used, as with Starlette's GZipMiddleware.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+                 compresslevel: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel,
+                         thread_minimum_size=COMPRESSION_THREAD_MINIMUM_SIZE,
+                         exclude_content_types=EXCLUDED_CONTENT_TYPES)
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and brotli is not None:
+            accepted = {
+                encoding.split(";")[0].strip().lower()
+                for encoding in Headers(scope=scope).get("Accept-Encoding", "").split(",")
+            }
+            if "br" in accepted:
+                responder = BrotliResponder(self.app, self.minimum_size, quality=self.brotli_quality)
+                await responder(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
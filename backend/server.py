@@ -1,11 +1,12 @@
-from fastapi import FastAPI, HTTPException, Request, Depends, status, File, UploadFile, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, status, File, UploadFile, Form
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import requests
 from typing import Dict
 from langchain.text_splitter import CharacterTextSplitter  # Add if not already imported
 import json  # Add if not already imported
@@ -18,8 +19,11 @@ import logging
 from datetime import timedelta, datetime
 from typing import List, Optional
 import uuid
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
-from bs4 import BeautifulSoup
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from chromadb import Client
 from chromadb.config import Settings
@@ -34,9 +38,57 @@ from auth import (
 
 # Import database models
 from database import (
-    get_db, User, LearningPath, Subtopic, CompletedSubtopic, Resource
+    get_db, engine, SessionLocal, User, LearningPath, Subtopic, CompletedSubtopic, Resource
 )
 
+# Import lexical retrieval
+from lexical_index import BM25Index, reciprocal_rank_fusion
+
+# Import RAG caching
+from rag_cache import LRUCache, ChromaCollectionVersion, normalize_question
+
+# Import HTML text extraction
+from extractors import extract_text
+
+# Import size-capped page fetching
+from fetcher import FetchResult, fetch_text
+
+# Import streaming upload storage
+from uploads import store_upload, UploadTooLarge, UploadStaticFiles
+import thumbnails
+
+# Import quiz session storage
+from quiz_sessions import create_quiz_session_store
+
+# Import document (PDF/Markdown/text) ingestion
+import documents
+
+# Import the shared vector service client
+from vector_client import (
+    VECTOR_STORE_MODE, VectorServiceClient, RemoteCollection, RemoteEmbeddingFunction,
+    RemoteLexicalIndex, RemoteCollectionVersion
+)
+
+# Import streaming ingestion pipeline
+from ingestion import iter_pages, iter_chunks, ingest_chunks
+
+# Import fast JSON responses and response compression
+from responses import FastJSONResponse, CompressionMiddleware
+
+# Import metrics, stage tracing and the DIAL client
+import metrics
+import tracing
+from llm_client import chat_completion, stream_chat_completion, start_model_catalog, DialError
+
+# Import topic summary parsing (whole and streamed)
+from topic_stream import TopicStreamParser, parse_topic_summary, ndjson_event, sse_event
+
+# Import admission control for LLM-backed endpoints
+from rate_limits import RATE_LIMIT_ENABLED, create_rate_limiter, endpoint_buckets, oversized, retry_after_header
+
+# Import the process-pool embedding executor
+from embedding_executor import EMBEDDING_WORKERS, PooledEmbeddingFunction
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -44,7 +96,17 @@ logger = logging.getLogger(__name__)
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
+
+# Compress large responses (brotli when available, else gzip)
+app.add_middleware(CompressionMiddleware)
+
+# Request latency and SQL statement counts per route, served at /metrics
+app.add_middleware(metrics.PrometheusMiddleware)
+metrics.instrument_engine(engine)
+
+# Root trace span per request (enabled with TRACE_EXPORTER)
+app.add_middleware(tracing.TracingMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -55,10 +117,6 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-# Load DIAL API key from environment variable
-DIAL_API_KEY = os.getenv("DIAL_API_KEY")
-DIAL_API_URL = "https://ai-proxy.lab.epam.com"
-
 # Get the absolute path to the templates directory
 BASE_DIR = pathlib.Path(__file__).parent.resolve()
 templates_dir = BASE_DIR / "templates"
@@ -78,25 +136,98 @@ templates = Jinja2Templates(directory=str(templates_dir))
 static_dir = BASE_DIR / "static"
 if not static_dir.exists():
     static_dir.mkdir(exist_ok=True)
+
+# Uploaded files (content-addressed, see uploads.py) are served with immutable
+# caching and Range support; mounted before /static so it takes precedence
+UPLOADS_DIR = static_dir / "uploads"
+UPLOADS_DIR.mkdir(exist_ok=True)
+app.mount("/static/uploads", UploadStaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
 app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
-# Initialize ChromaDB client with persistence
-chroma_client = Client(Settings(
-    anonymized_telemetry=False,
-    is_persistent=True,
-    persist_directory="chroma_store"
-))
-# Add this near the top of the file with other global variables
-questions_store: List[str] = []  # Temporary in-memory store
-
-# Set up sentence transformer embedding
-sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction()
-
-# Create or get collection
-collection = chroma_client.get_or_create_collection(
-    name="my_collection",
-    embedding_function=sentence_transformer_ef
+# Per-user quiz sessions shared across workers (SQLite by default, or Redis)
+quiz_sessions = create_quiz_session_store()
+
+# Per-user and global token buckets for LLM calls (in memory by default, or Redis)
+rate_limiter = create_rate_limiter()
+
+# How long a worker may serve a cached collection version before re-reading it from Chroma
+COLLECTION_VERSION_TTL_SECONDS = float(os.getenv("COLLECTION_VERSION_TTL_SECONDS", "1"))
+
+if VECTOR_STORE_MODE == "service":
+    # Collection, embedder and BM25 index live in one shared vector_service.py
+    # process; every API worker talks to it over a pooled HTTP client
+    vector_service = VectorServiceClient()
+    sentence_transformer_ef = RemoteEmbeddingFunction(vector_service)
+    collection = RemoteCollection(vector_service)
+    lexical_index = RemoteLexicalIndex(vector_service)
+    collection_version = RemoteCollectionVersion(vector_service)
+else:
+    # Initialize ChromaDB client with persistence
+    chroma_client = Client(Settings(
+        anonymized_telemetry=False,
+        is_persistent=True,
+        persist_directory="chroma_store"
+    ))
+
+    # Set up sentence transformer embedding; with EMBEDDING_WORKERS > 0 encoding runs
+    # in a process pool that micro-batches concurrent requests off the event loop
+    if EMBEDDING_WORKERS > 0:
+        sentence_transformer_ef = PooledEmbeddingFunction()
+    else:
+        sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction()
+
+    # Create or get collection
+    collection = chroma_client.get_or_create_collection(
+        name="my_collection",
+        embedding_function=sentence_transformer_ef
+    )
+
+    # BM25 index over the same chunks, kept in sync by add_chunks/clear_chunks; each
+    # worker holds its own copy and rebuilds it when another worker writes
+    lexical_index = BM25Index()
+
+    # Bumped on every collection write and shared by all workers; part of the /ask cache keys
+    collection_version = ChromaCollectionVersion(
+        chroma_client, collection.name, ttl_seconds=COLLECTION_VERSION_TTL_SECONDS
+    )
+
+# Collection version this worker's lexical index was built against (embedded mode only)
+lexical_index_version = None
+lexical_index_lock = threading.RLock()
+
+# Retrieval settings for /ask ("vector", "lexical" or "hybrid")
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+DEFAULT_RETRIEVAL_MODE = os.getenv("DEFAULT_RETRIEVAL_MODE", "vector")
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_CANDIDATES_FACTOR = 4
+
+# Ingestion pipeline: chunks embedded and added per batch, pages fetched ahead
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_PREFETCH_PAGES = int(os.getenv("INGEST_PREFETCH_PAGES", "2"))
+
+# Largest document accepted by /api/documents/ingest
+DOCUMENT_MAX_BYTES = int(os.getenv("DOCUMENT_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Limits for /ask/batch
+ASK_BATCH_MAX_QUESTIONS = int(os.getenv("ASK_BATCH_MAX_QUESTIONS", "64"))
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "8"))
+
+# Limits for /api/topics/batch
+TOPIC_BATCH_MAX_ITEMS = int(os.getenv("TOPIC_BATCH_MAX_ITEMS", "50"))
+TOPIC_BATCH_CONCURRENCY = int(os.getenv("TOPIC_BATCH_CONCURRENCY", "4"))
+
+# Largest list accepted by /api/learning-paths/{path_id}/resources/bulk
+RESOURCE_BULK_MAX_ITEMS = int(os.getenv("RESOURCE_BULK_MAX_ITEMS", "500"))
+
+# /ask caches: query text -> embedding, and
+# (normalized question, collection version, mode) -> retrieved ids and answer
+embedding_cache = LRUCache(max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")))
+answer_cache = LRUCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
 )
+metrics.register_cache("embedding", embedding_cache)
+metrics.register_cache("answer", answer_cache)
 
 # Models
 class TopicRequest(BaseModel):
@@ -105,6 +236,9 @@ class TopicRequest(BaseModel):
     component_id: str = None  # Field to track requesting component
     preferences: dict = None  # Add preferences field
 
+class BatchTopicRequest(BaseModel):
+    items: List[TopicRequest]
+
 class SubtopicModel(BaseModel):
     name: str
     explanation: str
@@ -131,11 +265,22 @@ class ResourceRequest(BaseModel):
     title: Optional[str] = None
     url: Optional[str] = None
 
+class BulkResourceItem(ResourceRequest):
+    subtopic_id: int
+
+class BulkResourceRequest(BaseModel):
+    resources: List[BulkResourceItem]
+
 class URLPayload(BaseModel):
     urls: List[str]
 
 class QuestionPayload(BaseModel):
     question: str
+    retrieval: Optional[str] = None  # "vector", "lexical" or "hybrid"
+
+class BatchQuestionPayload(BaseModel):
+    questions: List[str]
+    retrieval: Optional[str] = None  # "vector", "lexical" or "hybrid"
 
 # Helper functions for searching external content
 def search_image(query):
@@ -182,46 +327,230 @@ def search_youtube_video(query):
         logger.error(f"Error searching for video: {str(e)}")
         return None
 
+def fetch_page(url: str) -> FetchResult:
+    """Fetch a URL with size and content-type limits and extract its readable text"""
+    result = fetch_text(url)
+    if result.ok and result.is_html:
+        result.text = extract_text(result.text)
+        if not result.text:
+            result.skip_reason = "no text extracted"
+    return result
+
 def scrape_text_from_url(url: str) -> str:
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        return soup.get_text().strip()
+        result = fetch_page(url)
+        if not result.ok:
+            logger.info(f"Skipped {url}: {result.skip_reason}")
+        return result.text if result.ok else ""
     except Exception as e:
         print(f"Error scraping {url}: {e}")
         return ""
 
-def query_epam_dial_llm(question: str, context: str) -> str:
-    try:
-        endpoint_url = f"{DIAL_API_URL}/openai/deployments/gpt-4o/chat/completions"
-        headers = {
-            "Content-Type": "application/json",
-            "Api-Key": DIAL_API_KEY
-        }
-        params = {
-            "api-version": "2023-12-01-preview"
-        }
-        data = {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": f"Context:\n{context}\n\nQuestion: {question}"
-                }
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
+def rebuild_lexical_index(page_size: int = 5000):
+    """Rebuild the BM25 index from the documents persisted in the collection"""
+    global lexical_index_version
+    with lexical_index_lock:
+        # Read before paging, so writes made during the rebuild trigger another one
+        version = collection_version.read()
+        lexical_index.clear()
+        offset = 0
+        while True:
+            with metrics.chroma_timer("get"):
+                page = collection.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            lexical_index.add(page["ids"], page["documents"])
+            offset += len(page["ids"])
+        lexical_index_version = version
+    logger.info(f"Lexical index rebuilt with {len(lexical_index)} chunks")
+
+def refresh_lexical_index():
+    """Rebuild this worker's BM25 index if another worker has written to the collection since"""
+    # In service mode the vector service maintains the only index
+    if VECTOR_STORE_MODE == "service" or lexical_index_version == collection_version.current:
+        return
+    with lexical_index_lock:
+        if lexical_index_version != collection_version.current:
+            rebuild_lexical_index()
+
+@app.on_event("startup")
+def load_lexical_index():
+    # In service mode the vector service maintains its own index
+    if VECTOR_STORE_MODE != "service":
+        rebuild_lexical_index()
+
+@app.on_event("startup")
+def load_model_catalog():
+    start_model_catalog()
+
+def add_chunks(documents: List[str], ids: List[str], metadatas: Optional[List[dict]] = None,
+               embeddings: Optional[list] = None):
+    """Add chunks to the vector collection and the lexical index"""
+    global lexical_index_version
+    with metrics.chroma_timer("add"):
+        collection.add(documents=documents, ids=ids, metadatas=metadatas, embeddings=embeddings)
+    if VECTOR_STORE_MODE == "service":
+        lexical_index.add(ids, documents)
+        collection_version.bump()
+        return
+    with lexical_index_lock:
+        in_sync = lexical_index_version == collection_version.read()
+        lexical_index.add(ids, documents)
+        version = collection_version.bump()
+        # An index that had already missed another worker's write is rebuilt on the next search
+        lexical_index_version = version if in_sync else None
+
+def clear_chunks(page_size: int = 5000):
+    """Remove all chunks from the vector collection and the lexical index"""
+    global lexical_index_version
+    # Chroma has no "delete everything"; delete by id a page at a time
+    with metrics.chroma_timer("delete"):
+        while True:
+            ids = collection.get(include=[], limit=page_size)["ids"]
+            if not ids:
+                break
+            collection.delete(ids=ids)
+    with lexical_index_lock:
+        lexical_index.clear()
+        lexical_index_version = collection_version.bump()
+
+def ingest_urls(urls: List[str], splitter, with_metadata: bool = True, keep_first: int = 0) -> dict:
+    """Stream URLs through fetch -> split -> embed -> add in fixed-size batches"""
+    skipped = []
+    # Stages run interleaved (fetch on a prefetch thread), so each call gets its own span
+    fetch = tracing.wrap(fetch_page, "ingest.fetch")
+    split = tracing.wrap(splitter.split_text, "ingest.split")
+    embed = tracing.wrap(sentence_transformer_ef, "ingest.embed")
+    add = tracing.wrap(add_chunks, "ingest.add")
+    pages = iter_pages(urls, fetch, prefetch=INGEST_PREFETCH_PAGES, skipped=skipped)
+    chunks = iter_chunks(pages, split, with_metadata=with_metadata)
+    result = ingest_chunks(
+        chunks, add, embed=embed,
+        batch_size=INGEST_BATCH_SIZE, keep_first=keep_first
+    )
+    result["skipped"] = skipped
+    return result
+
+def embed_queries(questions: List[str]) -> list:
+    """Embed queries in one encoder pass, reusing cached embeddings for repeated text"""
+    embeddings = [embedding_cache.get(question) for question in questions]
+    missing = list(dict.fromkeys(q for q, e in zip(questions, embeddings) if e is None))
+    if missing:
+        with tracing.span("rag.embed", queries=len(missing)):
+            computed = dict(zip(missing, sentence_transformer_ef(missing)))
+        for question, embedding in computed.items():
+            embedding_cache.set(question, embedding)
+        embeddings = [computed[q] if e is None else e for q, e in zip(questions, embeddings)]
+    return embeddings
+
+def embed_query(question: str):
+    """Embed a single query, reusing the cached embedding for repeated text"""
+    return embed_queries([question])[0]
+
+def retrieve_documents_batch(questions: List[str], n_results: int = 5, mode: Optional[str] = None):
+    """Retrieve (ids, documents) for each question with one multi-query vector search"""
+    mode = mode or DEFAULT_RETRIEVAL_MODE
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}', expected one of {', '.join(RETRIEVAL_MODES)}")
+    if not questions:
+        return []
+
+    candidates = n_results if mode == "vector" else n_results * HYBRID_CANDIDATES_FACTOR
+    vector_ids = [[] for _ in questions]
+    documents_by_id = {}
+
+    if mode in ("vector", "hybrid"):
+        query_embeddings = embed_queries(questions)
+        with tracing.span("rag.vector_query", queries=len(questions)), metrics.chroma_timer("query"):
+            results = collection.query(query_embeddings=query_embeddings, n_results=candidates)
+        if results and results.get("ids"):
+            vector_ids = results["ids"]
+            for ids, documents in zip(results["ids"], results["documents"]):
+                documents_by_id.update(zip(ids, documents))
+
+    if mode != "vector":
+        refresh_lexical_index()
+
+    if mode == "vector":
+        ranked = vector_ids
+    elif mode == "hybrid":
+        with tracing.span("rag.lexical_search", queries=len(questions)):
+            ranked = [
+                reciprocal_rank_fusion(
+                    [ids, [doc_id for doc_id, _ in lexical_index.search(question, candidates)]],
+                    k=RRF_K, limit=n_results
+                )
+                for question, ids in zip(questions, vector_ids)
+            ]
+    else:
+        with tracing.span("rag.lexical_search", queries=len(questions)):
+            ranked = [[doc_id for doc_id, _ in lexical_index.search(question, n_results)] for question in questions]
+
+    missing_ids = list(dict.fromkeys(
+        doc_id for ids in ranked for doc_id in ids if doc_id not in documents_by_id
+    ))
+    if missing_ids:
+        with tracing.span("rag.fetch_documents", ids=len(missing_ids)), metrics.chroma_timer("get"):
+            fetched = collection.get(ids=missing_ids, include=["documents"])
+        documents_by_id.update(zip(fetched["ids"], fetched["documents"]))
+
+    retrieved = []
+    for ids in ranked:
+        ids = [doc_id for doc_id in ids if documents_by_id.get(doc_id)]
+        retrieved.append((ids, [documents_by_id[doc_id] for doc_id in ids]))
+    return retrieved
+
+def retrieve_documents(question: str, n_results: int = 5, mode: Optional[str] = None):
+    """Retrieve the most relevant chunk ids and documents using dense, lexical or fused (RRF) search"""
+    return retrieve_documents_batch([question], n_results=n_results, mode=mode)[0]
+
+def enforce_rate_limit(user_id: int, endpoint: str, calls: int = 1):
+    """
+    Reject with 429 and Retry-After when the user's or the global LLM budget is used up,
+    and with 413 when the request is larger than the budget could ever admit
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+    buckets = endpoint_buckets(user_id, endpoint, calls)
+    too_large = oversized(buckets)
+    if too_large is not None:
+        metrics.RATE_LIMITED.labels(endpoint).inc()
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Request needs {too_large.cost:.0f} of the {too_large.capacity:.0f} per-minute "
+                   f"rate limit budget; split it into smaller requests"
+        )
+    wait = rate_limiter.acquire(buckets)
+    if wait > 0:
+        metrics.RATE_LIMITED.labels(endpoint).inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded, please retry later",
+            headers={"Retry-After": retry_after_header(wait)}
+        )
 
-        response = requests.post(endpoint_url, headers=headers, params=params, json=data, timeout=60)
+def dial_http_exception(e: DialError) -> HTTPException:
+    """HTTP error for a failed DIAL call, passing on how long to wait before retrying"""
+    headers = {"Retry-After": retry_after_header(e.retry_after)} if e.retry_after is not None else None
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
 
-        if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
-        else:
-            print(f"LLM response error: {response.text}")
-            return "LLM failed to respond correctly."
+def query_epam_dial_llm(question: str, context: str, endpoint: str = "ask") -> str:
+    """Completion for a question and its context; raises DialError when the LLM call fails"""
+    try:
+        return chat_completion(f"Context:\n{context}\n\nQuestion: {question}", endpoint=endpoint)
+    except DialError as e:
+        logger.error(f"LLM response error ({endpoint}): {e.detail}")
+        raise
     except Exception as e:
-        print(f"Exception querying LLM: {e}")
-        return "LLM error."
+        logger.error(f"Exception querying LLM ({endpoint}): {e}")
+        raise
+
+def answer_with_context(question: str, cache_key: tuple, ids: List[str], documents: List[str]) -> str:
+    """Answer a question from retrieved documents and cache the result"""
+    # A failed upstream call raises, so it is never cached and the next ask retries the LLM
+    answer = query_epam_dial_llm(question, "\n".join(documents))
+    answer_cache.set(cache_key, {"ids": ids, "answer": answer})
+    return answer
 
 def generate_roadmap(topic, subtopics):
     # A simple implementation to generate a roadmap based on subtopics
@@ -250,6 +579,95 @@ def estimate_learning_time(topic, level, subtopics):
     
     return round(total_hours * complexity_factor, 1)
 
+def build_topic_prompt(request: TopicRequest) -> str:
+    """Prompt for a topic summary in the Overview/Subtopics format, with the request's preferences"""
+    preferences = request.preferences or {}
+    include_images = preferences.get("includeImages", False)
+    include_code = preferences.get("includeCode", False)
+    include_references = preferences.get("includeReferences", False)
+    include_videos = preferences.get("includeVideos", False)
+
+    # Build prompt with preferences
+    prompt = f"""
+You are a helpful educational assistant. Provide a structured summary for the topic: "{request.topic}" at a {request.level} level.
+
+Your response must follow this strict format:
+---
+Overview:
+[overview content]
+
+Subtopics:
+1. [Subtopic 1]: [short explanation]
+2. [Subtopic 2]: [short explanation]
+3. [Subtopic 3]: [short explanation]
+---
+
+Additional preferences to consider:
+"""
+
+    if include_images:
+        prompt += "- Include suggestions for relevant images or diagrams for each subtopic\n"
+    if include_code:
+        prompt += "- Include code examples where appropriate\n"
+    if include_references:
+        prompt += "- Include references to books, articles, or documentation\n"
+    if include_videos:
+        prompt += "- Include suggestions for video tutorials or courses\n"
+    return prompt
+
+def save_learning_path(db: Session, user_id: int, request: TopicRequest, overview: str,
+                       subtopics_with_explanations: List[dict], roadmap: str, estimated_hours: float) -> dict:
+    """Insert a learning path and its subtopics in one commit; returns the LearningPathResponse fields"""
+    path_data = add_learning_path(db, user_id, request, overview, subtopics_with_explanations,
+                                  roadmap, estimated_hours)
+    db.commit()
+    return path_data
+
+def add_learning_path(db: Session, user_id: int, request: TopicRequest, overview: str,
+                      subtopics_with_explanations: List[dict], roadmap: str, estimated_hours: float) -> dict:
+    """Stage a learning path and its subtopics in the session without committing"""
+    path_id = str(uuid.uuid4())
+    current_time = datetime.utcnow()
+
+    # Create learning path in database
+    db_learning_path = LearningPath(
+        id=path_id,
+        user_id=user_id,
+        topic=request.topic,
+        level=request.level,
+        overview=overview,
+        roadmap=roadmap,
+        estimated_hours=estimated_hours,
+        progress=0.0,
+        created_at=current_time,
+        last_updated=current_time
+    )
+    db.add(db_learning_path)
+
+    # Add subtopics to database
+    db.add_all([
+        Subtopic(
+            learning_path_id=path_id,
+            position=position,
+            name=subtopic_data["name"],
+            explanation=subtopic_data["explanation"]
+        )
+        for position, subtopic_data in enumerate(subtopics_with_explanations, start=1)
+    ])
+    return {
+        "id": path_id,
+        "topic": request.topic,
+        "level": request.level,
+        "overview": overview,
+        "subtopics": [subtopic["name"] for subtopic in subtopics_with_explanations],
+        "subtopics_detailed": subtopics_with_explanations,
+        "roadmap": roadmap,
+        "estimated_hours": estimated_hours,
+        "progress": 0.0,
+        "created_at": current_time,
+        "last_updated": current_time
+    }
+
 # Authentication routes
 @app.post("/token", response_model=Token)
 async def login_for_access_token(
@@ -282,13 +700,22 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
 async def serve_index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus metrics: request latency, DIAL calls and tokens, cache, Chroma and SQL stats"""
+    return metrics.metrics_response()
+
+# Plain def: the LLM call blocks (including retry backoff), so it runs in the threadpool
 @app.post("/api/topics", response_model=LearningPathResponse)
-async def submit_topic(
+def submit_topic(
     request: TopicRequest, 
     http_request: Request,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    enforce_rate_limit(current_user.id, "submit_topic")
+    # Stage spans: build_prompt, llm, parse, plan (roadmap and estimate), db_write
+    stages = tracing.Stages("submit_topic")
     try:
         # Extract component ID from request headers or use the one provided in the request body
         component_id = request.component_id
@@ -299,171 +726,232 @@ async def submit_topic(
         logger.info(f"Request received from component: {component_id}")
         logger.info(f"Request data: {request.dict()}")
         
-        # Extract preferences
-        preferences = request.preferences or {}
-        include_images = preferences.get("includeImages", False)
-        include_code = preferences.get("includeCode", False)
-        include_references = preferences.get("includeReferences", False)
-        include_videos = preferences.get("includeVideos", False)
-        
-        # Build prompt with preferences
-        prompt = f"""
-You are a helpful educational assistant. Provide a structured summary for the topic: "{request.topic}" at a {request.level} level.
+        stages.start("build_prompt")
+        prompt = build_topic_prompt(request)
 
-Your response must follow this strict format:
----
-Overview:
-[overview content]
+        stages.start("llm")
+        try:
+            text = chat_completion(prompt, endpoint="submit_topic")
+        except DialError as e:
+            raise dial_http_exception(e)
 
-Subtopics:
-1. [Subtopic 1]: [short explanation]
-2. [Subtopic 2]: [short explanation]
-3. [Subtopic 3]: [short explanation]
----
+        # Parse the API response into overview and subtopics
+        stages.start("parse", response_chars=len(text))
+        overview, subtopics_with_explanations = parse_topic_summary(text)
 
-Additional preferences to consider:
-"""
+        stages.start("plan", subtopics=len(subtopics_with_explanations))
+        subtopic_titles = [subtopic["name"] for subtopic in subtopics_with_explanations]
+        roadmap = generate_roadmap(request.topic, subtopic_titles)
+        estimated_hours = estimate_learning_time(request.topic, request.level, subtopic_titles)
 
-        if include_images:
-            prompt += "- Include suggestions for relevant images or diagrams for each subtopic\n"
-        if include_code:
-            prompt += "- Include code examples where appropriate\n"
-        if include_references:
-            prompt += "- Include references to books, articles, or documentation\n"
-        if include_videos:
-            prompt += "- Include suggestions for video tutorials or courses\n"
-
-        # Updated endpoint URL format
-        endpoint_url = "https://ai-proxy.lab.epam.com/openai/deployments/gpt-4o/chat/completions"
-        
-        # Add API version as a query parameter
-        params = {
-            "api-version": "2023-12-01-preview"
+        stages.start("db_write")
+        response_data = save_learning_path(db, current_user.id, request, overview, subtopics_with_explanations,
+                                           roadmap, estimated_hours)
+        stages.end()
+
+        # Add component tracking information to the response
+        response_data["request_metadata"] = {
+            "requesting_component": component_id,
+            "referer": referer,
+            "user_agent": user_agent
         }
         
-        # Updated headers format
-        headers = {
-            "Content-Type": "application/json",
-            "Api-Key": DIAL_API_KEY  # Note: Using Api-Key instead of Authorization
-        }
+        logger.info(f"Sending response for component: {component_id}")
+        return response_data
+        
+    except HTTPException as e:
+        stages.end(error=e)
+        raise
+    except Exception as e:
+        stages.end(error=e)
+        logger.error(f"Error processing request: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Updated request body format
-        data = {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1500
-        }
+def topic_batch_key(request: TopicRequest) -> tuple:
+    """Items with the same key produce the same prompt, so they share one generation"""
+    preferences = json.dumps(request.preferences or {}, sort_keys=True)
+    return " ".join(request.topic.lower().split()), request.level.strip().lower(), preferences
 
-        # Make the request with timeout
-        response = requests.post(
-            endpoint_url, 
-            headers=headers, 
-            json=data,
-            params=params,
-            timeout=60  # Increased timeout to 60 seconds
+@app.post("/api/topics/batch")
+def submit_topics_batch(
+    payload: BatchTopicRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create many learning paths at once, e.g. a cohort's topic x level grid.
+    Identical topic/level/preferences items are generated once and share a
+    path, generation runs concurrently (TOPIC_BATCH_CONCURRENCY), and all
+    paths are written in one transaction. Results keep the input order; an
+    item whose generation failed gets an error instead of a path.
+    """
+    if len(payload.items) > TOPIC_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {TOPIC_BATCH_MAX_ITEMS} topics are allowed per batch"
         )
 
-        # If there's an error in the response, raise an exception
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
+    first_index = {}
+    for i, item in enumerate(payload.items):
+        first_index.setdefault(topic_batch_key(item), i)
+    unique = sorted(first_index.values())
+    enforce_rate_limit(current_user.id, "submit_topic", calls=len(unique))
 
-        # Extract the response text - adjust based on the actual response format
-        response_data = response.json()
-        text = response_data["choices"][0]["message"]["content"]
+    def generate(i):
+        text = chat_completion(build_topic_prompt(payload.items[i]), endpoint="submit_topic")
+        return parse_topic_summary(text)
 
-        # Parse the API response into overview and subtopics
-        overview_match = text.split("Subtopics:")[0].strip()
-        if "Overview:" in overview_match:
-            overview_match = overview_match.split("Overview:")[1].strip()
-            
-        subtopics_block = text.split("Subtopics:\n")[-1]
-
-        # Extract subtopic titles from the response
-        subtopic_titles = []
-        subtopics_with_explanations = []
-        
-        for line in subtopics_block.split("\n"):
-            if line.strip() and line[0].isdigit():  # Check for numbered subtopics
-                title = line[line.index(".") + 1:].strip().split(":")[0].strip()
-                explanation = line.split(":", 1)[1].strip() if ":" in line else ""
-                subtopic_titles.append(title)
-                subtopics_with_explanations.append({"name": title, "explanation": explanation})
-
-        # Generate a roadmap
-        roadmap = generate_roadmap(request.topic, subtopic_titles)
-        
-        # Estimate learning time
-        estimated_hours = estimate_learning_time(request.topic, request.level, subtopic_titles)
-        
-        # Create a unique ID for this learning path
-        path_id = str(uuid.uuid4())
-        current_time = datetime.utcnow()
-        
-        # Create learning path in database
-        db_learning_path = LearningPath(
-            id=path_id,
-            user_id=current_user.id,
-            topic=request.topic,
-            level=request.level,
-            overview=overview_match,
-            roadmap=roadmap,
-            estimated_hours=estimated_hours,
-            progress=0.0,
-            created_at=current_time,
-            last_updated=current_time
-        )
-        
-        db.add(db_learning_path)
-        
-        # Add subtopics to database
-        for subtopic_data in subtopics_with_explanations:
-            db_subtopic = Subtopic(
-                learning_path_id=path_id,
-                name=subtopic_data["name"],
-                explanation=subtopic_data["explanation"]
+    try:
+        generated = {}
+        errors = {}
+        if unique:
+            with ThreadPoolExecutor(max_workers=min(TOPIC_BATCH_CONCURRENCY, len(unique))) as executor:
+                futures = {i: executor.submit(generate, i) for i in unique}
+                for i, future in futures.items():
+                    try:
+                        generated[i] = future.result()
+                    except Exception as e:
+                        logger.error(f"Error generating batch topic {i}: {str(e)}")
+                        errors[i] = e.detail if isinstance(e, DialError) else str(e)
+
+        paths = {}
+        for i, (overview, subtopics_with_explanations) in generated.items():
+            item = payload.items[i]
+            subtopic_titles = [subtopic["name"] for subtopic in subtopics_with_explanations]
+            paths[i] = add_learning_path(
+                db, current_user.id, item, overview, subtopics_with_explanations,
+                generate_roadmap(item.topic, subtopic_titles),
+                estimate_learning_time(item.topic, item.level, subtopic_titles)
             )
-            db.add(db_subtopic)
-        
         db.commit()
-        
-        # Prepare the response with component tracking information
-        response_data = {
-            "id": path_id,
-            "topic": request.topic,
-            "level": request.level,
-            "overview": overview_match,
-            "subtopics": subtopic_titles,
-            "subtopics_detailed": subtopics_with_explanations,
-            "roadmap": roadmap,
-            "estimated_hours": estimated_hours,
-            "progress": 0.0,
-            "created_at": current_time,
-            "last_updated": current_time,
-            "request_metadata": {
-                "requesting_component": component_id,
-                "referer": referer,
-                "user_agent": user_agent
-            }
-        }
-        
-        logger.info(f"Sending response for component: {component_id}")
-        return response_data
-        
     except Exception as e:
-        logger.error(f"Error processing request: {str(e)}")
+        db.rollback()
+        logger.error(f"Error in topics batch: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    results = []
+    for i, item in enumerate(payload.items):
+        source = first_index[topic_batch_key(item)]
+        result = {"index": i, "topic": item.topic, "level": item.level}
+        if source != i:
+            result["duplicate_of"] = source
+        if source in paths:
+            result.update(status="created", path=paths[source])
+        else:
+            result.update(status="error", error=errors[source])
+        results.append(result)
+    return {"results": results}
+
+@app.post("/api/topics/stream")
+def stream_topic(
+    request: TopicRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Like /api/topics, but stream the summary as it is generated: an "overview"
+    event per overview line and a "subtopic" event per numbered subtopic, then
+    a "complete" event with the saved learning path (or an "error" event).
+    Sent as NDJSON, or as Server-Sent Events when the client accepts text/event-stream.
+    """
+    enforce_rate_limit(current_user.id, "submit_topic")
+    user_id = current_user.id
+    request_metadata = {
+        "requesting_component": request.component_id,
+        "referer": http_request.headers.get("referer", "unknown"),
+        "user_agent": http_request.headers.get("user-agent", "unknown")
+    }
+    logger.info(f"Streaming request received from component: {request.component_id}")
+    prompt = build_topic_prompt(request)
+
+    def events():
+        parser = TopicStreamParser()
+        try:
+            for delta in stream_chat_completion(prompt, endpoint="submit_topic"):
+                yield from parser.feed(delta)
+            yield from parser.close()
+
+            # Persist what the whole completion parses to, exactly as /api/topics does
+            overview, subtopics_with_explanations = parse_topic_summary(parser.text)
+            subtopic_titles = [subtopic["name"] for subtopic in subtopics_with_explanations]
+            roadmap = generate_roadmap(request.topic, subtopic_titles)
+            estimated_hours = estimate_learning_time(request.topic, request.level, subtopic_titles)
+            # The request's session is closed by the time the body streams, so use a fresh one
+            db = SessionLocal()
+            try:
+                path = save_learning_path(db, user_id, request, overview, subtopics_with_explanations,
+                                          roadmap, estimated_hours)
+            finally:
+                db.close()
+            path["request_metadata"] = request_metadata
+            yield {"type": "complete", "path": jsonable_encoder(path)}
+        except Exception as e:
+            logger.error(f"Error streaming topic: {str(e)}")
+            yield {"type": "error", "detail": e.detail if isinstance(e, DialError) else str(e)}
+
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        body, media_type = (sse_event(event) for event in events()), "text/event-stream"
+    else:
+        body, media_type = (ndjson_event(event) for event in events()), "application/x-ndjson"
+    # X-Accel-Buffering stops nginx-style proxies from holding the stream back
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Clients may cache learning paths but must revalidate with If-None-Match
+LEARNING_PATH_CACHE_CONTROL = "private, no-cache"
+
+def learning_paths_etag(db: Session, user_id: int, path_id: str = None) -> Optional[str]:
+    """
+    Strong ETag for the user's learning paths (or one path), built from each
+    path's last_updated and completed-subtopic count in a single aggregate
+    query. Progress updates always bump last_updated, so the tag changes
+    whenever the response body does. Returns None if the path does not exist.
+    """
+    query = db.query(
+        LearningPath.id, LearningPath.last_updated, func.count(CompletedSubtopic.id)
+    ).outerjoin(
+        CompletedSubtopic, CompletedSubtopic.learning_path_id == LearningPath.id
+    ).filter(LearningPath.user_id == user_id)
+    if path_id is not None:
+        query = query.filter(LearningPath.id == path_id)
+    rows = query.group_by(LearningPath.id).order_by(LearningPath.id).all()
+    if path_id is not None and not rows:
+        return None
+
+    digest = hashlib.sha256()
+    for row_id, last_updated, completed_count in rows:
+        stamp = last_updated.isoformat() if last_updated else ""
+        digest.update(f"{row_id}|{stamp}|{completed_count}\n".encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header matches the ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag, "Cache-Control": LEARNING_PATH_CACHE_CONTROL})
+
 # New endpoints for the dashboard
 @app.get("/api/learning-paths", response_model=List[LearningPathResponse])
 async def get_learning_paths(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    # Answer revalidations from the aggregate query alone
+    etag = learning_paths_etag(db, current_user.id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = LEARNING_PATH_CACHE_CONTROL
+
     # Get all learning paths for the current user
     db_paths = db.query(LearningPath).filter(LearningPath.user_id == current_user.id).all()
     
@@ -471,7 +959,7 @@ async def get_learning_paths(
     paths_data = []
     for path in db_paths:
         # Get subtopics for this path
-        subtopics = db.query(Subtopic).filter(Subtopic.learning_path_id == path.id).all()
+        subtopics = db.query(Subtopic).filter(Subtopic.learning_path_id == path.id).order_by(Subtopic.position).all()
         subtopic_names = [s.name for s in subtopics]
         subtopics_detailed = [{"name": s.name, "explanation": s.explanation} for s in subtopics]
         
@@ -505,9 +993,19 @@ async def get_learning_paths(
 @app.get("/api/learning-paths/{path_id}", response_model=LearningPathResponse)
 async def get_learning_path(
     path_id: str, 
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    etag = learning_paths_etag(db, current_user.id, path_id)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Learning path not found")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = LEARNING_PATH_CACHE_CONTROL
+
     # Get the learning path
     path = db.query(LearningPath).filter(
         LearningPath.id == path_id,
@@ -518,7 +1016,7 @@ async def get_learning_path(
         raise HTTPException(status_code=404, detail="Learning path not found")
     
     # Get subtopics for this path
-    subtopics = db.query(Subtopic).filter(Subtopic.learning_path_id == path_id).all()
+    subtopics = db.query(Subtopic).filter(Subtopic.learning_path_id == path_id).order_by(Subtopic.position).all()
     subtopic_names = [s.name for s in subtopics]
     subtopics_detailed = [{"name": s.name, "explanation": s.explanation} for s in subtopics]
     
@@ -682,29 +1180,211 @@ async def get_resources(
         for r in resources
     ]
 
+def owned_path_exists(db: Session, path_id: str, user_id: int) -> bool:
+    """One EXISTS query: does the learning path exist and belong to the user"""
+    return db.query(
+        db.query(LearningPath.id).filter(
+            LearningPath.id == path_id,
+            LearningPath.user_id == user_id
+        ).exists()
+    ).scalar()
+
+@app.get("/api/learning-paths/{path_id}/resources")
+def get_path_resources(
+    path_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    All resources of a learning path grouped by subtopic, in subtopic order.
+    One ownership check and one subtopic/resource join replace a per-subtopic
+    resources call; subtopics without resources are listed with an empty list.
+    """
+    if not owned_path_exists(db, path_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Learning path not found")
+
+    rows = db.query(
+        Subtopic.id, Subtopic.position, Subtopic.name,
+        Resource.id, Resource.type, Resource.content, Resource.title, Resource.url
+    ).outerjoin(
+        Resource, Resource.subtopic_id == Subtopic.id
+    ).filter(
+        Subtopic.learning_path_id == path_id
+    ).order_by(Subtopic.position, Resource.id).all()
+
+    groups = {}
+    for subtopic_id, position, subtopic_name, resource_id, resource_type, content, title, url in rows:
+        group = groups.get(subtopic_id)
+        if group is None:
+            group = groups[subtopic_id] = {
+                "subtopic_id": subtopic_id, "position": position, "name": subtopic_name, "resources": []
+            }
+        if resource_id is not None:
+            group["resources"].append({
+                "id": resource_id,
+                "type": resource_type,
+                "content": content,
+                "title": title,
+                "url": url
+            })
+    return {"path_id": path_id, "subtopics": list(groups.values())}
+
+@app.post("/api/learning-paths/{path_id}/resources/bulk")
+def add_resources_bulk(
+    path_id: str,
+    payload: BulkResourceRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Add many resources to a learning path's subtopics in one transaction.
+    Every subtopic_id must belong to the path, otherwise nothing is inserted.
+    Returns the created resources in request order.
+    """
+    if len(payload.resources) > RESOURCE_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {RESOURCE_BULK_MAX_ITEMS} resources are allowed per request"
+        )
+    if not owned_path_exists(db, path_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Learning path not found")
+
+    requested_ids = {item.subtopic_id for item in payload.resources}
+    known_ids = {
+        subtopic_id for (subtopic_id,) in db.query(Subtopic.id).filter(
+            Subtopic.learning_path_id == path_id,
+            Subtopic.id.in_(requested_ids)
+        )
+    } if requested_ids else set()
+    missing = sorted(requested_ids - known_ids)
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Subtopics not found in this learning path: {', '.join(map(str, missing))}"
+        )
+
+    rows = [
+        {
+            "subtopic_id": item.subtopic_id,
+            "type": item.type,
+            "content": item.content,
+            "title": item.title,
+            "url": item.url
+        }
+        for item in payload.resources
+    ]
+    if not rows:
+        return []
+    try:
+        # One multi-row INSERT ... RETURNING; ORM add_all would insert row by row to collect ids.
+        # Rows get ascending ids in VALUES order, so sorting restores the request order
+        # (sort_by_parameter_order would make SQLite fall back to one INSERT per row).
+        ids = sorted(db.execute(insert(Resource).returning(Resource.id), rows).scalars().all())
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error adding resources: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error adding resources: {str(e)}")
+    return [{"id": resource_id, **row} for resource_id, row in zip(ids, rows)]
+
 # Endpoint for file uploads (images, etc.)
 @app.post("/api/upload")
 async def upload_file(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_active_user)
 ):
-    # Create uploads directory if it doesn't exist
-    uploads_dir = BASE_DIR / "static" / "uploads" / str(current_user.id)
-    uploads_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate unique filename
-    file_extension = file.filename.split(".")[-1]
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = uploads_dir / unique_filename
+    # Stream the file to content-addressed storage
+    try:
+        stored = await store_upload(file, UPLOADS_DIR, current_user.id)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
     
-    # Save the file
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    # Resized WebP previews are rendered in the background process pool; only ready
+    # ones are returned, the rest are listed by /api/uploads/{sha256}/variants once done
+    pending_variants = thumbnails.schedule_variants(stored["path"], UPLOADS_DIR, stored["sha256"])
     
     # Return the URL to access the file
-    file_url = f"/static/uploads/{current_user.id}/{unique_filename}"
+    file_url = f"/static/uploads/{current_user.id}/{stored['filename']}"
     
-    return {"url": file_url, "filename": unique_filename}
+    return {
+        "url": file_url,
+        "filename": stored["filename"],
+        "sha256": stored["sha256"],
+        "size": stored["size"],
+        "duplicate": stored["duplicate"],
+        "variants": thumbnails.available_variants(UPLOADS_DIR, stored["sha256"]),
+        "variants_pending": pending_variants
+    }
+
+@app.get("/api/uploads/{sha256}/variants")
+async def get_upload_variants(
+    sha256: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """List the preview variants of an upload that have finished rendering"""
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        raise HTTPException(status_code=400, detail="Invalid upload digest")
+    return {"sha256": sha256, "variants": thumbnails.available_variants(UPLOADS_DIR, sha256)}
+
+@app.on_event("shutdown")
+def shutdown_thumbnail_pool():
+    thumbnails.shutdown()
+
+@app.post("/api/documents/ingest")
+async def ingest_document(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Add an uploaded PDF, Markdown or text file to the RAG collection.
+    The file is streamed to disk, then parsed and split page by page in a
+    process pool and embedded in fixed-size batches.
+    """
+    kind = documents.document_kind(file.filename)
+    if kind is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported document type, expected one of {', '.join(documents.DOCUMENT_KINDS)}"
+        )
+
+    try:
+        stored = await store_upload(file, UPLOADS_DIR, current_user.id, max_bytes=DOCUMENT_MAX_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+    def ingest():
+        chunks = documents.iter_document_chunks(
+            str(stored["path"]), kind, doc_key=stored["sha256"][:16], source=file.filename
+        )
+        return ingest_chunks(chunks, add_chunks, embed=sentence_transformer_ef, batch_size=INGEST_BATCH_SIZE)
+
+    try:
+        result = await run_in_threadpool(ingest)
+    except Exception as e:
+        logger.error(f"Error ingesting document {file.filename}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error ingesting document: {str(e)}")
+
+    if not result["chunks_added"]:
+        return {"status": "error", "message": "No text extracted from document", "filename": file.filename}
+    return {
+        "status": "success",
+        "filename": file.filename,
+        "sha256": stored["sha256"],
+        "chunks_added": result["chunks_added"]
+    }
+
+@app.on_event("shutdown")
+def shutdown_document_pool():
+    documents.shutdown()
+
+@app.on_event("shutdown")
+def flush_traces():
+    tracing.shutdown()
+
+@app.on_event("shutdown")
+def shutdown_embedding_pool():
+    if isinstance(sentence_transformer_ef, PooledEmbeddingFunction):
+        sentence_transformer_ef.shutdown()
 
 # New endpoints for searching external content
 @app.get("/api/search/images")
@@ -786,7 +1466,7 @@ async def search_videos(
         raise HTTPException(status_code=500, detail=f"Error searching for videos: {str(e)}")
     
 @app.get("/api/learning-paths/{path_id}/subtopics/{subtopic_id}/detailed")
-async def get_detailed_subtopic_content(
+def get_detailed_subtopic_content(
     path_id: str,
     subtopic_id: int,
     current_user: User = Depends(get_current_active_user),
@@ -803,16 +1483,15 @@ async def get_detailed_subtopic_content(
         if not path:
             raise HTTPException(status_code=404, detail="Learning path not found")
         
-        # Get the subtopic
-        subtopics = db.query(Subtopic).filter(
-            Subtopic.learning_path_id == path_id
-        ).all()
+        # Get the subtopic by its position in the path (unique index lookup)
+        subtopic = db.query(Subtopic).filter(
+            Subtopic.learning_path_id == path_id,
+            Subtopic.position == subtopic_id
+        ).first()
         
-        if not subtopics or len(subtopics) < subtopic_id:
+        if not subtopic:
             raise HTTPException(status_code=404, detail="Subtopic not found")
         
-        subtopic = subtopics[subtopic_id - 1]
-        
         # Check if we already have a detailed explanation
         detailed_resource = db.query(Resource).filter(
             Resource.subtopic_id == subtopic.id,
@@ -837,41 +1516,12 @@ Expand on this with a comprehensive explanation that would help someone understa
 Include key points, examples, and practical applications where relevant.
 """
 
-        # Make API call to generate detailed content
-        endpoint_url = "https://ai-proxy.lab.epam.com/openai/deployments/gpt-4o/chat/completions"
-        
-        params = {
-            "api-version": "2023-12-01-preview"
-        }
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Api-Key": DIAL_API_KEY
-        }
-
-        data = {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
-        
-        response = requests.post(
-            endpoint_url, 
-            headers=headers, 
-            json=data,
-            params=params,
-            timeout=60
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
-        
-        detailed_explanation = response.json()["choices"][0]["message"]["content"]
+        # Make API call to generate detailed content; only generation counts against the rate limit
+        enforce_rate_limit(current_user.id, "detailed_subtopic")
+        try:
+            detailed_explanation = chat_completion(prompt, endpoint="detailed_subtopic")
+        except DialError as e:
+            raise dial_http_exception(e)
         
         # Store the detailed explanation
         new_resource = Resource(
@@ -890,6 +1540,8 @@ Include key points, examples, and practical applications where relevant.
             "detailed_explanation": detailed_explanation
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating detailed content: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -902,28 +1554,22 @@ def submit_urls(
 ):
     try:
         # Clear old data
-        collection.delete(where={"id": {"$ne": ""}})
+        with tracing.span("submit_urls.clear"):
+            clear_chunks()
 
         splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-        all_chunks = []
-        all_ids = []
-        all_metadata = []
-
-        for idx, url in enumerate(payload.urls):
-            text = scrape_text_from_url(url)
-            print(f"Scraped text from {url}: {text[:100]}...")  # For debugging
-            if text:
-                chunks = splitter.split_text(text)
-                for chunk_idx, chunk in enumerate(chunks):
-                    all_chunks.append(chunk)
-                    all_ids.append(f"doc_{idx}_{chunk_idx}")
-                    all_metadata.append({"url": url})
-
-        if all_chunks:
-            collection.add(documents=all_chunks, ids=all_ids, metadatas=all_metadata)
-            return {"status": "success", "chunks_added": len(all_chunks)}
+        with tracing.span("submit_urls.ingest", urls=len(payload.urls)) as span:
+            result = ingest_urls(payload.urls, splitter)
+            span.set_attribute("chunks_added", result["chunks_added"])
+
+        if result["chunks_added"]:
+            return {"status": "success", "chunks_added": result["chunks_added"], "skipped": result["skipped"]}
         else:
-            return {"status": "error", "message": "No text extracted from provided URLs"}
+            return {
+                "status": "error",
+                "message": "No text extracted from provided URLs",
+                "skipped": result["skipped"]
+            }
 
     except Exception as e:
         print(f"Error in submit_urls: {e}")
@@ -935,62 +1581,135 @@ def ask_question(
     current_user: User = Depends(get_current_active_user)
 ):
     try:
-        results = collection.query(query_texts=[payload.question], n_results=5)
-        if results and results.get("documents") and results["documents"][0]:
-            context = "\n".join(results["documents"][0])
-            answer = query_epam_dial_llm(payload.question, context)
+        mode = payload.retrieval or DEFAULT_RETRIEVAL_MODE
+        cache_key = (normalize_question(payload.question), collection_version.current, mode)
+        with tracing.span("ask.cache_lookup") as span:
+            cached = answer_cache.get(cache_key)
+            span.set_attribute("hit", cached is not None)
+        if cached is not None:
+            return {"answer": cached["answer"]}
+
+        with tracing.span("ask.retrieve", mode=mode):
+            ids, documents = retrieve_documents(payload.question, n_results=5, mode=mode)
+
+        if documents:
+            # Only questions that reach the LLM are charged; cache hits are free
+            enforce_rate_limit(current_user.id, "ask")
+            with tracing.span("ask.answer", documents=len(documents)):
+                answer = answer_with_context(payload.question, cache_key, ids, documents)
             return {"answer": answer}
         else:
             return {"error": "No relevant context found."}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in ask: {e}")
         return {"error": str(e)}
 
+@app.post("/ask/batch")
+def ask_questions_batch(
+    payload: BatchQuestionPayload,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Answer many questions at once.
+    Embeds all uncached questions in one encoder pass, runs one multi-query
+    vector search and calls the LLM concurrently. Results keep the input order.
+    """
+    if len(payload.questions) > ASK_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {ASK_BATCH_MAX_QUESTIONS} questions are allowed per batch"
+        )
+
+    try:
+        mode = payload.retrieval or DEFAULT_RETRIEVAL_MODE
+        version = collection_version.current
+        questions = payload.questions
+        cache_keys = [(normalize_question(q), version, mode) for q in questions]
+        results = [None] * len(questions)
+        to_retrieve = []
+
+        for i, cache_key in enumerate(cache_keys):
+            cached = answer_cache.get(cache_key)
+            if cached is not None:
+                results[i] = {"question": questions[i], "answer": cached["answer"]}
+            else:
+                to_retrieve.append(i)
+
+        retrieved = dict(zip(
+            to_retrieve,
+            retrieve_documents_batch([questions[i] for i in to_retrieve], n_results=5, mode=mode)
+        ))
+
+        def answer(i):
+            ids, documents = retrieved[i]
+            if not documents:
+                return {"question": questions[i], "error": "No relevant context found."}
+            return {
+                "question": questions[i],
+                "answer": answer_with_context(questions[i], cache_keys[i], ids, documents)
+            }
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        # Charge the budget for the LLM calls only, not for cache hits or questions without context
+        llm_calls = sum(1 for i in pending if retrieved[i][1])
+        if llm_calls:
+            enforce_rate_limit(current_user.id, "ask", calls=llm_calls)
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(ASK_BATCH_CONCURRENCY, len(pending))) as executor:
+                futures = {i: executor.submit(answer, i) for i in pending}
+                for i, future in futures.items():
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        logger.error(f"Error answering batch question {i}: {str(e)}")
+                        results[i] = {"question": questions[i], "error": str(e)}
+
+        return {"results": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in ask batch: {str(e)}")
+        return {"error": str(e)}
+
 @app.post("/clear")
 def clear_collection(
     current_user: User = Depends(get_current_active_user)
 ):
     try:
-        collection.delete(where={"id": {"$ne": ""}})
+        clear_chunks()
         return {"status": "success", "message": "Collection cleared"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
     
 class AnswersPayload(BaseModel):
     answers: Dict[str, str]  # keys come as strings from JSON
+    quiz_id: Optional[str] = None  # defaults to the user's most recent quiz
 
 @app.post("/generate-quiz")
 def generate_quiz(
     payload: URLPayload,
     current_user: User = Depends(get_current_active_user)
 ):
+    enforce_rate_limit(current_user.id, "generate_quiz")
     try:
-        collection.delete(where={"id": {"$ne": ""}})
+        clear_chunks()
         splitter = CharacterTextSplitter(separator="\n", chunk_size=1000, chunk_overlap=100)
-        all_chunks = []
-        all_ids = []
-
-        for i, url in enumerate(payload.urls):
-            text = scrape_text_from_url(url)  # Using the existing function
-            chunks = splitter.split_text(text)
-            for j, chunk in enumerate(chunks):
-                all_chunks.append(chunk)
-                all_ids.append(f"doc_{i}_{j}")
-
-        collection.add(documents=all_chunks, ids=all_ids)
+        result = ingest_urls(payload.urls, splitter, with_metadata=False, keep_first=5)
 
         # Generate 10 questions
-        context = "\n".join(all_chunks[:5])  # limit context
+        context = "\n".join(result["sample"])  # limit context
         prompt = f"Context:\n{context}\n\nGenerate 10 conceptual quiz questions for a student based on this content. Strictly generate questions only, no answers."
-        quiz_text = query_epam_dial_llm(prompt, "")  # Using existing function
+        quiz_text = query_epam_dial_llm(prompt, "", endpoint="generate_quiz")  # Using existing function
 
-        global questions_store
         # Normalize questions from the LLM output
-        questions_store = [
+        questions = [
             q.strip("- ").strip() for q in quiz_text.strip().split("\n") if q.strip()
         ][:10]
+        quiz_id = quiz_sessions.create(current_user.id, questions)
 
-        return {"questions": questions_store}
+        return {"quiz_id": quiz_id, "questions": questions}
     except Exception as e:
         logger.error(f"Error generating quiz: {str(e)}")
         return {"error": str(e)}
@@ -1000,9 +1719,19 @@ def evaluate_answers(
     payload: AnswersPayload,
     current_user: User = Depends(get_current_active_user)
 ):
+    if payload.quiz_id:
+        questions_store = quiz_sessions.get(payload.quiz_id, current_user.id)
+        if questions_store is None:
+            return {"error": "Quiz not found or expired."}
+    else:
+        latest = quiz_sessions.latest(current_user.id)
+        questions_store = latest[1] if latest else []
+
     if not questions_store:
         return {"error": "No quiz generated yet."}
 
+    enforce_rate_limit(current_user.id, "submit_answers", calls=max(len(payload.answers), 1))
+
     results = []
     score = 0.0
 
@@ -1036,7 +1765,11 @@ User Answer: {user_answer}
 
 Evaluate the answer on a scale of 0 to 1. Respond with a JSON like: {{ "score": 0.7, "feedback": "Good but missed a detail." }}
 """
-        result = query_epam_dial_llm(prompt, "")  # Using existing function
+        try:
+            result = query_epam_dial_llm(prompt, "", endpoint="submit_answers")  # Using existing function
+        except DialError as e:
+            # Scoring an outage as a wrong answer would be worse than asking to resubmit
+            raise dial_http_exception(e)
 
         try:
             parsed = json.loads(result)
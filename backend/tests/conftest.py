@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# The backend modules are imported flat (as server.py does), from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
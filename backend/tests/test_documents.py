@@ -0,0 +1,45 @@
+# test_documents.py
+from documents import strip_markdown
+
+
+def test_identifiers_survive():
+    text = "Call get_user_by_id and set MAX_RETRY_COUNT, see __init__ and a*b*c"
+    assert strip_markdown(text) == text
+
+
+def test_emphasis_and_code_are_unwrapped():
+    assert strip_markdown("Some **bold**, *italic* and `code` text.") == "Some bold, italic and code text."
+
+
+def test_headings_links_and_images():
+    text = "# Title\nSee [the docs](https://example.com) ![diagram](d.png)"
+    assert strip_markdown(text) == "Title\nSee the docs diagram"
+
+
+def test_fences_and_html_tags_are_removed():
+    text = "```python\nprint('hi')\n```\n<b>bold</b>"
+    assert strip_markdown(text) == "\nprint('hi')\n\nbold"
+
+
+def test_fenced_code_is_kept_verbatim():
+    text = (
+        "Use `List<String>` here.\n"
+        "```java\nList<String> names = new ArrayList<>();\n```\n"
+        "```rust\nlet bytes: Vec<u8> = Vec::new(); // a<b and c>d\n```\n"
+        "```python\n# load the **config** first\nimport os\n```"
+    )
+    assert strip_markdown(text) == (
+        "Use List<String> here.\n"
+        "\nList<String> names = new ArrayList<>();\n\n"
+        "\nlet bytes: Vec<u8> = Vec::new(); // a<b and c>d\n\n"
+        "\n# load the **config** first\nimport os\n"
+    )
+
+
+def test_indented_code_and_unknown_tags_survive():
+    text = "Intro with a<b and c>d <em>here</em>\n\n    # not a heading\n    x = *p*\n\n#hashtag"
+    assert strip_markdown(text) == "Intro with a<b and c>d here\n\n    # not a heading\n    x = *p*\n\n#hashtag"
+
+
+def test_block_starting_inside_a_fence():
+    assert strip_markdown("# comment\n```\n## Heading", in_fence=True) == "# comment\n\nHeading"
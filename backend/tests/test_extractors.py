@@ -0,0 +1,56 @@
+# test_extractors.py
+import pytest
+
+pytest.importorskip("lxml")
+
+from extractors import extract_with_lxml  # noqa: E402
+
+
+def page(body: str) -> str:
+    return f"<html><head><title>t</title></head><body>{body}</body></html>"
+
+
+@pytest.mark.parametrize("wrapper", [
+    '<div class="layout with-sidebar"><main>{}</main></div>',
+    '<div id="main-nav-wrapper page"><article>{}</article></div>',
+    '<div class="ads-free content"><p>{}</p></div>',
+    '<div class="sidebar"><div role="main">{}</div></div>',
+])
+def test_keeps_content_inside_wrappers_named_like_boilerplate(wrapper):
+    text = extract_with_lxml(page(wrapper.format("The article body.")))
+    assert "The article body." in text
+
+
+def test_drops_page_chrome():
+    html = page(
+        '<nav><a href="/">Home</a></nav>'
+        '<div class="cookie-banner">We use cookies</div>'
+        '<div id="sidebar">Related stuff</div>'
+        '<main><h1>Title</h1><p>First paragraph.</p><p>Second paragraph.</p></main>'
+        '<footer>Copyright</footer>'
+    )
+    text = extract_with_lxml(html)
+    assert "First paragraph." in text and "Second paragraph." in text
+    for chrome in ("Home", "cookies", "Related stuff", "Copyright"):
+        assert chrome not in text
+
+
+def test_class_names_match_whole_tokens_only():
+    text = extract_with_lxml(page('<div class="navigation-free">Kept</div><div class="post nav">Dropped</div>'))
+    assert "Kept" in text
+    assert "Dropped" not in text
+
+
+def test_article_header_is_kept():
+    text = extract_with_lxml(page("<article><header>Byline</header><p>Body</p></article>"))
+    assert "Byline" in text
+
+
+def test_falls_back_to_body_when_everything_looks_like_boilerplate():
+    text = extract_with_lxml(page('<div class="menu">Only text on the page<script>x()</script></div>'))
+    assert text == "Only text on the page"
+
+
+def test_paragraphs_become_lines():
+    text = extract_with_lxml(page("<main><p>One</p><p>Two</p></main>"))
+    assert text == "One\n\nTwo"
@@ -0,0 +1,94 @@
+# test_fetcher.py
+import codecs
+
+import requests
+
+from fetcher import fetch_text, sniff_encoding
+
+
+class FakeResponse:
+    def __init__(self, body: bytes, headers=None, status_code=200, chunk_size=7):
+        self.body = body
+        self.headers = headers or {}
+        self.status_code = status_code
+        self.chunk_size = chunk_size
+        self.chunks_read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size=None):
+        for start in range(0, len(self.body), self.chunk_size):
+            self.chunks_read += 1
+            yield self.body[start:start + self.chunk_size]
+
+
+class FakeSession:
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+
+    def get(self, url, stream=False, timeout=None):
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+def fetch(body: bytes, headers=None, **kwargs):
+    response = FakeResponse(body, headers)
+    return fetch_text("http://example.com", session=FakeSession(response), **kwargs), response
+
+
+def test_declared_charset_is_used():
+    result, _ = fetch("Grüße".encode("latin-1"), {"Content-Type": "text/plain; charset=ISO-8859-1"})
+    assert result.ok and result.text == "Grüße"
+
+
+def test_meta_charset_is_sniffed():
+    body = '<html><head><meta charset="windows-1251"></head><body>Привет</body></html>'.encode("cp1251")
+    result, _ = fetch(body, {"Content-Type": "text/html"})
+    assert "Привет" in result.text
+
+
+def test_utf8_split_across_chunks():
+    # Each multi-byte character straddles a 7-byte chunk boundary somewhere
+    result, _ = fetch(("ünïcødé " * 20).encode("utf-8"), {"Content-Type": "text/plain; charset=utf-8"})
+    assert result.text == "ünïcødé " * 20
+
+
+def test_bom_wins_over_default():
+    assert sniff_encoding(codecs.BOM_UTF8 + b"abc") == "utf-8-sig"
+    assert sniff_encoding(b"plain ascii") == "utf-8"
+    assert sniff_encoding(b"\xff\xfeh\x00i\x00") == "utf-16"
+
+
+def test_declared_length_over_cap_is_skipped_before_reading():
+    result, response = fetch(b"x" * 100, {"Content-Type": "text/plain", "Content-Length": "100"}, max_bytes=10)
+    assert not result.ok and "exceeds limit" in result.skip_reason
+    assert response.chunks_read == 0
+
+
+def test_streamed_body_over_cap_stops_early():
+    result, response = fetch(b"x" * 1000, {"Content-Type": "text/plain"}, max_bytes=20)
+    assert not result.ok and result.skip_reason == "body exceeds limit of 20 bytes"
+    assert response.chunks_read < 10
+
+
+def test_unsupported_content_type_and_errors():
+    result, response = fetch(b"%PDF", {"Content-Type": "application/pdf"})
+    assert result.skip_reason == "unsupported content type application/pdf"
+    assert response.chunks_read == 0
+
+    result = fetch_text("http://example.com", session=FakeSession(FakeResponse(b"", status_code=404)))
+    assert result.skip_reason == "HTTP 404"
+
+    result = fetch_text("http://example.com", session=FakeSession(error=requests.ConnectionError("boom")))
+    assert result.skip_reason == "request failed: ConnectionError"
+
+
+def test_empty_body_is_skipped():
+    result, _ = fetch(b"   \n", {"Content-Type": "text/plain"})
+    assert result.skip_reason == "empty body"
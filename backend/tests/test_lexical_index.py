@@ -0,0 +1,68 @@
+# test_lexical_index.py
+from lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def build_index(**kwargs) -> BM25Index:
+    index = BM25Index(**kwargs)
+    index.add(
+        ["a", "b", "c"],
+        [
+            "Call os.path.join to build paths",
+            "The server returned ERR-404 for the missing page",
+            "Paths and files are covered in this chapter",
+        ],
+    )
+    return index
+
+
+def test_tokenize_keeps_compound_identifiers_and_their_parts():
+    assert tokenize("os.path.join ERR-404") == ["os.path.join", "os", "path", "join", "err-404", "err", "404"]
+
+
+def test_exact_identifier_ranks_first():
+    results = build_index().search("ERR-404")
+    assert results[0][0] == "b"
+    assert results[0][1] > 0
+
+
+def test_no_match_and_empty_index():
+    assert build_index().search("kubernetes") == []
+    assert BM25Index().search("anything") == []
+
+
+def test_delete_and_compaction():
+    index = build_index(compact_ratio=0.0)
+    index.delete(["b"])
+    assert len(index) == 2
+    assert index.search("ERR-404") == []
+    assert {doc_id for doc_id, _ in index.search("paths")} == {"a", "c"}
+
+
+def test_readding_an_id_replaces_its_document():
+    index = build_index()
+    index.add(["a"], ["nothing relevant"])
+    assert len(index) == 3
+    assert "a" not in [doc_id for doc_id, _ in index.search("os.path.join")]
+
+
+def test_readding_compacts_tombstones():
+    index = build_index(compact_ratio=0.0)
+    for _ in range(3):
+        index.add(["a"], ["Call os.path.join to build paths"])
+    assert index._deleted == 0
+    assert len(index._doc_ids) == 3
+    assert index.search("os.path.join")[0][0] == "a"
+
+
+def test_clear():
+    index = build_index()
+    index.clear()
+    assert len(index) == 0
+    assert index.search("paths") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], k=60)
+    assert fused[0] == "y"
+    assert set(fused) == {"x", "y", "z", "w"}
+    assert reciprocal_rank_fusion([["x", "y", "z"]], limit=2) == ["x", "y"]
@@ -0,0 +1,173 @@
+# test_llm_resilience.py
+import itertools
+import threading
+
+import pytest
+
+import llm_client
+import llm_resilience
+from llm_client import DialError, _with_retries
+from llm_resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, backoff_delay, parse_retry_after
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def deployment(monkeypatch):
+    """A fresh deployment name, with retry sleeps recorded instead of slept"""
+    sleeps = []
+    monkeypatch.setattr(llm_client.time, "sleep", sleeps.append)
+    monkeypatch.setattr(llm_client, "DIAL_MAX_RETRIES", 2)
+    name = f"test-deployment-{next(_names)}"
+    yield name, sleeps
+
+
+def failing(*errors, result="ok"):
+    """An attempt that raises the given errors in turn, then returns result"""
+    calls = iter(errors)
+
+    def attempt():
+        error = next(calls, None)
+        if error is not None:
+            raise error
+        return result
+    return attempt
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_delay(monkeypatch):
+    monkeypatch.setattr(llm_resilience, "DIAL_BACKOFF_BASE_SECONDS", 0.5)
+    monkeypatch.setattr(llm_resilience, "DIAL_BACKOFF_MAX_SECONDS", 8.0)
+    for attempt in range(6):
+        assert 0 <= backoff_delay(attempt) <= min(8.0, 0.5 * 2 ** attempt)
+    assert backoff_delay(0, retry_after=2.0) >= 2.0
+    assert backoff_delay(0, retry_after=60.0) is None
+
+
+def test_breaker_opens_and_probes():
+    breaker = CircuitBreaker("b", failure_threshold=2, reset_timeout=0.0)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    # Reset timeout elapsed: exactly one probe is admitted
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("b", failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure()
+    assert not breaker.allow()
+    breaker.reset_timeout = 0.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_release_frees_only_this_threads_probe():
+    breaker = CircuitBreaker("b", failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    other = threading.Thread(target=breaker.release)
+    other.start()
+    other.join()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_retries_retryable_errors(deployment):
+    name, sleeps = deployment
+    attempt = failing(DialError("busy", status_code=503, retryable=True),
+                      DialError("slow down", status_code=429, retryable=True, retry_after=1.0))
+    assert _with_retries(name, "test", attempt) == ("ok", 2)
+    assert len(sleeps) == 2 and sleeps[1] >= 1.0
+
+
+def test_gives_up_after_max_retries(deployment):
+    name, sleeps = deployment
+    attempt = failing(*[DialError("busy", status_code=503, retryable=True)] * 3)
+    with pytest.raises(DialError, match="busy"):
+        _with_retries(name, "test", attempt)
+    assert len(sleeps) == 2
+
+
+def test_non_retryable_error_is_raised_at_once(deployment):
+    name, sleeps = deployment
+    with pytest.raises(DialError):
+        _with_retries(name, "test", failing(DialError("bad request", status_code=400)))
+    assert sleeps == []
+
+
+def test_only_transport_errors_and_5xx_open_the_circuit(deployment, monkeypatch):
+    name, _ = deployment
+    monkeypatch.setattr(llm_client, "DIAL_MAX_RETRIES", 0)
+    breaker = llm_resilience.get_breaker(name)
+    breaker.failure_threshold = 2
+    for _ in range(3):
+        with pytest.raises(DialError):
+            _with_retries(name, "test", failing(DialError("throttled", status_code=429, retryable=True)))
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+    for _ in range(2):
+        with pytest.raises(DialError):
+            _with_retries(name, "test", failing(DialError("transport", retryable=True)))
+    assert breaker.state == OPEN
+    with pytest.raises(DialError) as raised:
+        _with_retries(name, "test", failing())
+    assert raised.value.status_code == 503 and raised.value.retry_after is not None
+
+
+def test_probe_is_released_when_the_attempt_raises_something_else(deployment):
+    name, _ = deployment
+    breaker = llm_resilience.get_breaker(name)
+    breaker.failure_threshold = 1
+    breaker.reset_timeout = 0.0
+    breaker.record_failure()
+
+    def broken():
+        raise ValueError("malformed")
+
+    with pytest.raises(ValueError):
+        _with_retries(name, "test", broken)
+    # The half-open probe was handed back, so the next call can probe again
+    assert _with_retries(name, "test", failing()) == ("ok", 0)
+    assert breaker.state == CLOSED
+
+
+def test_failed_hedge_loser_counts_against_the_circuit(deployment, monkeypatch):
+    name, _ = deployment
+    release_primary = threading.Event()
+    primary_done = threading.Event()
+    calls = itertools.count()
+
+    def attempt(url, headers, data, deployment, endpoint):
+        if next(calls) == 0:
+            release_primary.wait(5)
+            primary_done.set()
+            raise DialError("upstream", status_code=502, retryable=True)
+        return "hedged"
+
+    monkeypatch.setattr(llm_client, "hedge_delay", lambda deployment: 0.01)
+    monkeypatch.setattr(llm_client, "_attempt", attempt)
+    assert llm_client._hedged_attempt("url", {}, {}, name, "ask") == "hedged"
+    assert llm_resilience.get_breaker(name).failures == 0
+    release_primary.set()
+    assert primary_done.wait(5)
+    # The breaker is updated from the loser's done callback; time.sleep is patched by the fixture
+    for _ in range(100):
+        if llm_resilience.get_breaker(name).failures:
+            break
+        threading.Event().wait(0.01)
+    assert llm_resilience.get_breaker(name).failures == 1
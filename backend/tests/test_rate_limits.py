@@ -0,0 +1,66 @@
+# test_rate_limits.py
+import pytest
+
+import rate_limits
+from rate_limits import Bucket, MemoryRateLimiter, RateLimiter, RedisRateLimiter, endpoint_buckets, oversized
+
+
+def buckets(cost: float = 1, capacity: float = 2, refill: float = 1.0):
+    return [Bucket("user:1:requests", capacity, refill, 1), Bucket("user:1:tokens", capacity * 10, refill * 10, cost)]
+
+
+def test_rate_limiter_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimiter()
+
+
+def test_memory_limiter_admits_burst_then_waits():
+    limiter = MemoryRateLimiter()
+    assert limiter.acquire(buckets()) == 0
+    assert limiter.acquire(buckets()) == 0
+    wait = limiter.acquire(buckets())
+    assert 0 < wait <= 1.0
+
+
+def test_acquire_is_all_or_nothing():
+    limiter = MemoryRateLimiter()
+    # The token bucket refuses, so the request bucket must not be charged either
+    assert limiter.acquire(buckets(cost=25)) > 0
+    assert limiter.acquire(buckets()) == 0
+    assert limiter.acquire(buckets()) == 0
+
+
+def test_refill(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limits.time, "monotonic", lambda: now[0])
+    limiter = MemoryRateLimiter()
+    for _ in range(2):
+        assert limiter.acquire(buckets()) == 0
+    assert limiter.acquire(buckets()) == pytest.approx(1.0)
+    now[0] += 1.0
+    assert limiter.acquire(buckets()) == 0
+
+
+def test_endpoint_buckets_are_not_clamped(monkeypatch):
+    monkeypatch.setattr(rate_limits, "USER_TOKENS_PER_MINUTE", 10000.0)
+    charged = endpoint_buckets(1, "ask", calls=8)
+    tokens = next(bucket for bucket in charged if bucket.key == "user:1:tokens")
+    assert tokens.cost == rate_limits.ESTIMATED_TOKENS["ask"] * 8
+    assert oversized(charged) == tokens
+    assert oversized(endpoint_buckets(1, "ask")) is None
+
+
+def test_default_budget_fits_the_largest_batches():
+    # ASK_BATCH_MAX_QUESTIONS and TOPIC_BATCH_MAX_ITEMS in server.py
+    assert oversized(endpoint_buckets(1, "ask", calls=64)) is None
+    assert oversized(endpoint_buckets(1, "submit_topic", calls=50)) is None
+
+
+def test_redis_limiter_shares_state_between_instances():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeRedis(decode_responses=True)
+    first, second = RedisRateLimiter(client=client), RedisRateLimiter(client=client)
+    assert first.acquire(buckets()) == 0
+    assert second.acquire(buckets()) == 0
+    assert first.acquire(buckets()) > 0
@@ -0,0 +1,68 @@
+# test_topic_stream.py
+import pytest
+
+from topic_stream import TopicStreamParser, ndjson_event, parse_topic_summary, sse_event
+
+SUMMARY = """Overview:
+Go is a statically typed language.
+It compiles to native code.
+
+Subtopics:
+1. Syntax: Variables, types and control flow
+2. Concurrency: Goroutines and channels
+3. Tooling
+"""
+
+
+def stream(text: str, size: int):
+    parser = TopicStreamParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    events.extend(parser.close())
+    return parser, events
+
+
+def test_parse_topic_summary():
+    overview, subtopics = parse_topic_summary(SUMMARY)
+    assert overview == "Go is a statically typed language.\nIt compiles to native code."
+    assert subtopics == [
+        {"name": "Syntax", "explanation": "Variables, types and control flow"},
+        {"name": "Concurrency", "explanation": "Goroutines and channels"},
+        {"name": "Tooling", "explanation": ""},
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, len(SUMMARY)])
+def test_stream_events_do_not_depend_on_chunking(size):
+    parser, events = stream(SUMMARY, size)
+    assert events == [
+        {"type": "overview", "text": "Go is a statically typed language."},
+        {"type": "overview", "text": "It compiles to native code."},
+        {"type": "subtopic", "index": 1, "name": "Syntax", "explanation": "Variables, types and control flow"},
+        {"type": "subtopic", "index": 2, "name": "Concurrency", "explanation": "Goroutines and channels"},
+        {"type": "subtopic", "index": 3, "name": "Tooling", "explanation": ""},
+    ]
+    assert parser.text == SUMMARY
+
+
+def test_subtopic_is_emitted_once_its_line_is_complete():
+    parser = TopicStreamParser()
+    assert parser.feed("Subtopics:\n1. Syntax: Vari") == []
+    assert parser.feed("ables\n") == [{"type": "subtopic", "index": 1, "name": "Syntax", "explanation": "Variables"}]
+
+
+def test_unterminated_last_line_is_flushed_on_close():
+    _, events = stream("Subtopics:\n1. Syntax: basics", 4)
+    assert events == [{"type": "subtopic", "index": 1, "name": "Syntax", "explanation": "basics"}]
+
+
+def test_summary_without_headers_is_all_overview():
+    _, events = stream("Just a paragraph.\nAnd another.", 5)
+    assert events == [{"type": "overview", "text": "Just a paragraph."}, {"type": "overview", "text": "And another."}]
+
+
+def test_event_encodings():
+    event = {"type": "overview", "text": "Café"}
+    assert ndjson_event(event) == '{"type": "overview", "text": "Café"}\n'
+    assert sse_event(event) == 'event: overview\ndata: {"type": "overview", "text": "Café"}\n\n'
@@ -0,0 +1,112 @@
+# thumbnails.py
+import logging
+import multiprocessing
+import os
+import pathlib
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Widths of the WebP preview variants generated for uploaded images
+THUMBNAIL_WIDTHS = tuple(int(w) for w in os.getenv("THUMBNAIL_WIDTHS", "160,480,960").split(",") if w.strip())
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tif", ".tiff")
+
+# Variants are content-addressed like their originals: <root>/variants/<sha[:2]>/<sha>_<width>.webp
+VARIANTS_DIRNAME = "variants"
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def variant_path(uploads_root: pathlib.Path, digest: str, width: int) -> pathlib.Path:
+    return uploads_root / VARIANTS_DIRNAME / digest[:2] / f"{digest}_{width}.webp"
+
+
+def variant_url(digest: str, width: int) -> str:
+    return f"/static/uploads/{VARIANTS_DIRNAME}/{digest[:2]}/{digest}_{width}.webp"
+
+
+def render_variants(source: str, uploads_root: str, digest: str, widths) -> Dict[int, str]:
+    """Resize an image to each width and save it as WebP (runs in a worker process)"""
+    from PIL import Image
+
+    rendered = {}
+    with Image.open(source) as image:
+        image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for width in widths:
+            target = variant_path(pathlib.Path(uploads_root), digest, width)
+            if target.exists():
+                rendered[width] = str(target)
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            variant = image.copy()
+            if variant.width > width:
+                height = max(1, round(variant.height * width / variant.width))
+                variant = variant.resize((width, height), Image.LANCZOS)
+            # Write then rename so a half-written variant is never served
+            temp = target.with_name(f"{target.name}.{uuid.uuid4().hex}.part")
+            variant.save(temp, format="WEBP", quality=THUMBNAIL_QUALITY, method=4)
+            os.replace(temp, target)
+            rendered[width] = str(target)
+    return rendered
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    # Created on first use from a request thread; spawned, not forked from the threaded server
+    with _executor_lock:
+        if _executor is None and THUMBNAIL_WORKERS > 0:
+            _executor = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Error generating image variants: {str(error)}")
+
+
+def schedule_variants(source: pathlib.Path, uploads_root: pathlib.Path, digest: str) -> List[str]:
+    """
+    Queue the missing WebP variants of an uploaded image on the process pool.
+    Returns the widths being rendered; available_variants lists them once done.
+    """
+    if source.suffix.lower() not in IMAGE_EXTENSIONS or not THUMBNAIL_WIDTHS:
+        return []
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return []
+
+    missing = [w for w in THUMBNAIL_WIDTHS if not variant_path(uploads_root, digest, w).exists()]
+    executor = _get_executor()
+    if not missing or executor is None:
+        return []
+    future = executor.submit(render_variants, str(source), str(uploads_root), digest, missing)
+    future.add_done_callback(_log_failure)
+    return [str(width) for width in missing]
+
+
+def available_variants(uploads_root: pathlib.Path, digest: str) -> Dict[str, str]:
+    """URLs of the variants of an upload that have already been rendered"""
+    return {
+        str(width): variant_url(digest, width)
+        for width in THUMBNAIL_WIDTHS
+        if variant_path(uploads_root, digest, width).exists()
+    }
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
@@ -0,0 +1,118 @@
+# topic_stream.py
+"""
+Parsing of the topic summaries requested by /api/topics, in one go or as the
+completion streams in.
+
+The LLM is asked for:
+
+    Overview:
+    [overview content]
+
+    Subtopics:
+    1. [Subtopic 1]: [short explanation]
+    2. [Subtopic 2]: [short explanation]
+"""
+import json
+from typing import List, Optional, Tuple
+
+
+def parse_subtopic_line(line: str) -> Optional[dict]:
+    """{"name", "explanation"} for a numbered line like "1. Name: explanation", else None"""
+    if not (line.strip() and line[0].isdigit()) or "." not in line:
+        return None
+    title = line[line.index(".") + 1:].strip().split(":")[0].strip()
+    explanation = line.split(":", 1)[1].strip() if ":" in line else ""
+    return {"name": title, "explanation": explanation}
+
+
+def parse_topic_summary(text: str) -> Tuple[str, List[dict]]:
+    """Overview text and subtopics of a complete summary"""
+    overview = text.split("Subtopics:")[0].strip()
+    if "Overview:" in overview:
+        overview = overview.split("Overview:")[1].strip()
+
+    subtopics = []
+    for line in text.split("Subtopics:\n")[-1].split("\n"):
+        subtopic = parse_subtopic_line(line)
+        if subtopic is not None:
+            subtopics.append(subtopic)
+    return overview, subtopics
+
+
+class TopicStreamParser:
+    """
+    Incremental counterpart of parse_topic_summary. feed() takes completion
+    deltas and returns an event for each overview line and numbered subtopic
+    as soon as its line is complete:
+
+        {"type": "overview", "text": "..."}
+        {"type": "subtopic", "index": 1, "name": "...", "explanation": "..."}
+
+    The streamed events are for display; parse_topic_summary(parser.text)
+    gives what is persisted.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._line = ""
+        self._section = "preamble"
+        self._preamble: List[str] = []
+        self.subtopics = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, delta: str) -> List[dict]:
+        self._chunks.append(delta)
+        self._line += delta
+        events = []
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            events.extend(self._parse_line(line))
+        return events
+
+    def close(self) -> List[dict]:
+        """Events for the unterminated last line, and for a summary without section headers"""
+        line, self._line = self._line, ""
+        events = self._parse_line(line) if line else []
+        if self._section == "preamble":
+            events = self._overview_events(self._preamble) + events
+        return events
+
+    def _overview_events(self, lines: List[str]) -> List[dict]:
+        return [{"type": "overview", "text": line.strip()} for line in lines if line.strip()]
+
+    def _parse_line(self, line: str) -> List[dict]:
+        if self._section != "subtopics" and "Subtopics:" in line:
+            before = line.split("Subtopics:")[0]
+            # Without an "Overview:" header everything before the subtopics is the overview
+            events = self._overview_events((self._preamble if self._section == "preamble" else []) + [before])
+            self._preamble = []
+            self._section = "subtopics"
+            return events
+
+        if self._section == "preamble":
+            if "Overview:" not in line:
+                self._preamble.append(line)
+                return []
+            self._section = "overview"
+            self._preamble = []
+            line = line.split("Overview:", 1)[1]
+
+        if self._section == "overview":
+            return self._overview_events([line])
+
+        subtopic = parse_subtopic_line(line)
+        if subtopic is None:
+            return []
+        self.subtopics += 1
+        return [{"type": "subtopic", "index": self.subtopics, **subtopic}]
+
+
+def ndjson_event(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def sse_event(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
@@ -0,0 +1,370 @@
+# tracing.py
+"""
+Lightweight stage tracing with OpenTelemetry-compatible spans.
+
+Spans use W3C/OTel ids and are exported in the OTLP JSON span shape, either as
+JSON lines in a local file or batched to an OTLP/HTTP collector:
+
+    TRACE_EXPORTER=jsonl TRACE_FILE=traces.jsonl uvicorn server:app
+    TRACE_EXPORTER=otlp OTLP_TRACES_ENDPOINT=http://127.0.0.1:4318/v1/traces uvicorn server:app
+
+TracingMiddleware opens one root span per HTTP request (joining an incoming
+W3C traceparent if present) and endpoints add child spans per stage. With
+TRACE_EXPORTER unset tracing is disabled and span() is a no-op.
+benchmarks/otlp_collector.py is a local collector stand-in and
+benchmarks/trace_summary.py reports per-stage latency percentiles.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+OTLP_TRACES_ENDPOINT = os.getenv("OTLP_TRACES_ENDPOINT", "http://127.0.0.1:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "learns-backend")
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "256"))
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "2"))
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class RemoteParent(NamedTuple):
+    """Parent span context received from another service"""
+    trace_id: str
+    span_id: str
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[RemoteParent]:
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    return RemoteParent(match.group(1), match.group(2)) if match else None
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns",
+                 "attributes", "status_code", "status_message")
+
+    def __init__(self, name: str, parent=None, attributes: Dict[str, Any] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent else ""
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = dict(attributes or {})
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def record_exception(self, error: BaseException):
+        self.status_code = STATUS_ERROR
+        self.status_message = str(error)[:500]
+        self.attributes["exception.type"] = type(error).__name__
+
+    def to_otlp(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JSONLinesExporter:
+    """Appends one OTLP JSON span per line to a local file"""
+
+    def __init__(self, path: str = TRACE_FILE, service_name: str = TRACE_SERVICE_NAME):
+        self.path = path
+        self.service_name = service_name
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as handle:
+            for span in spans:
+                record = span.to_otlp()
+                record["serviceName"] = self.service_name
+                handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+class OTLPHTTPExporter:
+    """Posts batches to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint: str = OTLP_TRACES_ENDPOINT, service_name: str = TRACE_SERVICE_NAME):
+        import requests
+
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.session = requests.Session()
+
+    def export(self, spans: List[Span]):
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "learns.tracing"}, "spans": [span.to_otlp() for span in spans]}],
+            }]
+        }
+        response = self.session.post(self.endpoint, json=body, timeout=5)
+        response.raise_for_status()
+
+
+class BatchSpanProcessor:
+    """Queues finished spans and exports them from a background thread"""
+
+    def __init__(self, exporter, batch_size: int = TRACE_BATCH_SIZE, flush_seconds: float = TRACE_FLUSH_SECONDS,
+                 max_queue: int = 10000):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            # Never block a request on the exporter
+            self.dropped += 1
+
+    def _export(self, batch: List[Span]):
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.warning(f"Dropped {len(batch)} spans, export failed: {e}")
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                item = False
+            if item is None:
+                if batch:
+                    self._export(batch)
+                return
+            if item:
+                batch.append(item)
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._export(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_seconds
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_processor: Optional[BatchSpanProcessor] = None
+
+
+def configure(exporter=None):
+    """Install an exporter (or the one selected by TRACE_EXPORTER); None disables tracing"""
+    global _processor
+    if exporter is None:
+        if TRACE_EXPORTER == "jsonl":
+            exporter = JSONLinesExporter()
+        elif TRACE_EXPORTER == "otlp":
+            exporter = OTLPHTTPExporter()
+        elif TRACE_EXPORTER:
+            raise ValueError(f"Unknown trace exporter '{TRACE_EXPORTER}', expected 'jsonl' or 'otlp'")
+    shutdown()
+    _processor = BatchSpanProcessor(exporter) if exporter is not None else None
+
+
+def shutdown():
+    """Flush queued spans and stop exporting"""
+    global _processor
+    if _processor is not None:
+        _processor.shutdown()
+        _processor = None
+
+
+def enabled() -> bool:
+    return _processor is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, parent=None, **attributes):
+    """
+    Time a stage as a child of `parent` or of the current span.
+    Exceptions mark the span as failed and are re-raised.
+    """
+    processor = _processor
+    if processor is None:
+        yield NOOP_SPAN
+        return
+    current = Span(name, parent or _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        processor.submit(current)
+
+
+def start_span(name: str, parent=None, **attributes):
+    """
+    Open a span without making it current, for work that outlives one call
+    frame (e.g. a generator consumed by a streaming response). Close it with
+    finish_span. Returns NOOP_SPAN when tracing is disabled.
+    """
+    if _processor is None:
+        return NOOP_SPAN
+    return Span(name, parent or _current_span.get(), attributes)
+
+
+def finish_span(opened: Span, error: BaseException = None):
+    if not isinstance(opened, Span):
+        return
+    if error is not None:
+        opened.record_exception(error)
+    opened.end_ns = time.time_ns()
+    processor = _processor
+    if processor is not None:
+        processor.submit(opened)
+
+
+class Stages:
+    """
+    Consecutive stage spans for long sequential code: start() ends the previous
+    stage and opens the next, so stages need not be nested `with` blocks.
+    Call end(error) from the exception handler to mark the failing stage.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._span: Optional[Span] = None
+        self._token = None
+
+    def start(self, stage: str, **attributes):
+        self.end()
+        if _processor is None:
+            return
+        self._span = Span(f"{self.prefix}.{stage}", _current_span.get(), attributes)
+        self._token = _current_span.set(self._span)
+
+    def end(self, error: BaseException = None):
+        if self._span is None:
+            return
+        if error is not None:
+            self._span.record_exception(error)
+        self._span.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        processor = _processor
+        if processor is not None:
+            processor.submit(self._span)
+        self._span = None
+        self._token = None
+
+
+def wrap(fn, name: str):
+    """
+    Return fn traced as `name`, parented to the span current at wrap time.
+    Use for callables handed to other threads or pipelines, where the context
+    variable is not inherited. Returns fn unchanged when tracing is disabled.
+    """
+    if _processor is None:
+        return fn
+    parent = _current_span.get()
+
+    @wraps(fn)
+    def traced(*args, **kwargs):
+        with span(name, parent=parent):
+            return fn(*args, **kwargs)
+
+    return traced
+
+
+class TracingMiddleware:
+    """Root span per HTTP request, named after the matched route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _processor is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with span(scope["method"], parent=parent, **{"http.method": scope["method"]}) as root:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                root.name = f"{scope['method']} {route}"
+                root.set_attribute("http.route", route)
+                root.set_attribute("http.status_code", status_code)
+                if status_code >= 500:
+                    root.status_code = STATUS_ERROR
+
+
+configure()
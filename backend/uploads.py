@@ -0,0 +1,144 @@
+# uploads.py
+import hashlib
+import os
+import pathlib
+import re
+import shutil
+import uuid
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+# Uploads are read and written in chunks of this size
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+
+# Content-addressed blobs live under <uploads root>/objects/<sha[:2]>/<sha>.<ext>
+OBJECTS_DIRNAME = "objects"
+
+_SAFE_EXTENSION = re.compile(r"^[a-z0-9]{1,10}$")
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+def safe_extension(filename: str) -> str:
+    """Return a lowercase, filesystem-safe extension (with dot) for a client filename"""
+    extension = (filename or "").rsplit(".", 1)[-1].lower() if "." in (filename or "") else ""
+    return f".{extension}" if _SAFE_EXTENSION.match(extension) else ""
+
+
+def blob_path(uploads_root: pathlib.Path, digest: str, extension: str) -> pathlib.Path:
+    return uploads_root / OBJECTS_DIRNAME / digest[:2] / f"{digest}{extension}"
+
+
+def _write_chunk(handle, hasher, chunk: bytes):
+    hasher.update(chunk)
+    handle.write(chunk)
+
+
+def _link_or_copy(source: pathlib.Path, target: pathlib.Path):
+    """Reference an existing blob from a user directory without duplicating bytes"""
+    if target.exists():
+        return
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        # Filesystems without hard links fall back to a copy
+        shutil.copyfile(source, target)
+
+
+def _commit_blob(temp_path: pathlib.Path, blob: pathlib.Path, user_path: pathlib.Path) -> bool:
+    """Move a finished upload into content-addressed storage; returns True if it was a duplicate"""
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    user_path.parent.mkdir(parents=True, exist_ok=True)
+    duplicate = blob.exists()
+    if duplicate:
+        temp_path.unlink()
+    else:
+        os.replace(temp_path, blob)
+    _link_or_copy(blob, user_path)
+    return duplicate
+
+
+async def store_upload(file: UploadFile, uploads_root: pathlib.Path, user_id: int,
+                       max_bytes: int = None) -> dict:
+    """
+    Stream an upload to disk in fixed-size chunks, hashing it on the fly.
+    File I/O runs in the threadpool so the event loop is never blocked. Identical
+    content is stored once and referenced from each user's upload directory.
+    """
+    max_bytes = max_bytes or UPLOAD_MAX_BYTES
+    temp_dir = uploads_root / OBJECTS_DIRNAME / "tmp"
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = temp_dir / f"{uuid.uuid4()}.part"
+
+    hasher = hashlib.sha256()
+    size = 0
+    handle = await run_in_threadpool(open, temp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"File exceeds the maximum upload size of {max_bytes} bytes")
+            await run_in_threadpool(_write_chunk, handle, hasher, chunk)
+    except BaseException:
+        await run_in_threadpool(handle.close)
+        await run_in_threadpool(temp_path.unlink, True)
+        raise
+    await run_in_threadpool(handle.close)
+
+    digest = hasher.hexdigest()
+    extension = safe_extension(file.filename)
+    filename = f"{digest}{extension}"
+    user_path = uploads_root / str(user_id) / filename
+    duplicate = await run_in_threadpool(
+        _commit_blob, temp_path, blob_path(uploads_root, digest, extension), user_path
+    )
+
+    return {
+        "filename": filename,
+        "sha256": digest,
+        "size": size,
+        "duplicate": duplicate,
+        "path": user_path,
+    }
+
+
+# Serving: content-addressed files never change, so they can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+_CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64})(?:_(\d+))?(?:\.[a-z0-9]{1,10})?$")
+
+
+class UploadStaticFiles(StaticFiles):
+    """
+    StaticFiles for uploads: content-addressed files get a strong sha256 ETag
+    and immutable Cache-Control. Range requests (checked against that ETag for
+    If-Range) are answered by Starlette's FileResponse.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        match = _CONTENT_ADDRESSED_NAME.match(os.path.basename(full_path))
+        if not match:
+            return response
+
+        response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        if isinstance(response, NotModifiedResponse):
+            return response
+
+        etag = f'"{match.group(0)}"'
+        response.headers["etag"] = etag
+        request_headers = Headers(scope=scope)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        return response
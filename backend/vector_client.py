@@ -0,0 +1,131 @@
+# vector_client.py
+import os
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# API workers talk to vector_service.py when VECTOR_STORE_MODE=service
+VECTOR_STORE_MODE = os.getenv("VECTOR_STORE_MODE", "embedded")
+VECTOR_SERVICE_URL = os.getenv("VECTOR_SERVICE_URL", "http://127.0.0.1:8100")
+VECTOR_SERVICE_POOL_SIZE = int(os.getenv("VECTOR_SERVICE_POOL_SIZE", "16"))
+VECTOR_SERVICE_TIMEOUT_SECONDS = float(os.getenv("VECTOR_SERVICE_TIMEOUT_SECONDS", "60"))
+
+
+class VectorServiceError(Exception):
+    """Raised when the vector service returns an error response"""
+
+
+class VectorServiceClient:
+    """Pooled HTTP client for the shared vector store service"""
+
+    def __init__(self, base_url: str = VECTOR_SERVICE_URL, pool_size: int = VECTOR_SERVICE_POOL_SIZE,
+                 timeout: float = VECTOR_SERVICE_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, path: str, payload: Optional[dict] = None) -> dict:
+        response = self.session.request(method, f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        if response.status_code != 200:
+            raise VectorServiceError(f"Vector service {path} failed ({response.status_code}): {response.text}")
+        return response.json()
+
+
+def _to_list(embedding):
+    return embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
+
+
+class RemoteEmbeddingFunction:
+    """Embedding function computed by the service's single model copy"""
+
+    def __init__(self, client: VectorServiceClient):
+        self.client = client
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        if not input:
+            return []
+        return self.client.request("POST", "/embed", {"texts": list(input)})["embeddings"]
+
+
+class RemoteCollection:
+    """The subset of the Chroma Collection API used by server.py, served remotely"""
+
+    def __init__(self, client: VectorServiceClient):
+        self.client = client
+
+    def add(self, ids: List[str], documents: List[str], metadatas: Optional[List[dict]] = None,
+            embeddings: Optional[list] = None):
+        self.client.request("POST", "/add", {
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+            "embeddings": [_to_list(e) for e in embeddings] if embeddings is not None else None,
+        })
+
+    def query(self, query_embeddings: Optional[list] = None, query_texts: Optional[List[str]] = None,
+              n_results: int = 10, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        payload = {"n_results": n_results}
+        if query_embeddings is not None:
+            payload["query_embeddings"] = [_to_list(e) for e in query_embeddings]
+        if query_texts is not None:
+            payload["query_texts"] = query_texts
+        if include is not None:
+            payload["include"] = include
+        return self.client.request("POST", "/query", payload)
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[dict] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        payload = {"ids": ids, "where": where, "limit": limit, "offset": offset}
+        if include is not None:
+            payload["include"] = include
+        return self.client.request("POST", "/get", payload)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[dict] = None):
+        self.client.request("POST", "/delete", {"ids": ids, "where": where})
+
+    def count(self) -> int:
+        return self.client.request("GET", "/count")["count"]
+
+
+class RemoteLexicalIndex:
+    """
+    BM25 index hosted by the service.
+    The service indexes on /add and /delete itself, so local updates are no-ops.
+    """
+
+    def __init__(self, client: VectorServiceClient):
+        self.client = client
+
+    def add(self, ids, documents):
+        pass
+
+    def delete(self, ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query: str, n_results: int = 5):
+        results = self.client.request("POST", "/lexical/search", {"query": query, "n_results": n_results})
+        return [tuple(item) for item in results["results"]]
+
+    def __len__(self):
+        return self.client.request("GET", "/count")["count"]
+
+
+class RemoteCollectionVersion:
+    """Collection version owned by the service, bumped there on every write"""
+
+    def __init__(self, client: VectorServiceClient):
+        self.client = client
+
+    @property
+    def current(self) -> int:
+        return self.client.request("GET", "/version")["version"]
+
+    def bump(self) -> int:
+        return self.current
@@ -0,0 +1,174 @@
+# vector_service.py
+"""
+Shared vector store service.
+
+Runs the persistent Chroma collection, the sentence-transformer embedder and the
+BM25 index in one process so any number of API workers can share them:
+
+    uvicorn vector_service:app --host 127.0.0.1 --port 8100 --workers 1
+
+API workers use it with VECTOR_STORE_MODE=service (see vector_client.py).
+It must run with a single worker: it is the only writer of chroma_store.
+"""
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from chromadb import Client
+from chromadb.config import Settings
+from chromadb.utils import embedding_functions
+from fastapi import FastAPI
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from embedding_executor import EMBEDDING_WORKERS, PooledEmbeddingFunction
+from lexical_index import BM25Index
+from rag_cache import CollectionVersion
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "chroma_store")
+CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "my_collection")
+
+app = FastAPI()
+
+chroma_client = Client(Settings(
+    anonymized_telemetry=False,
+    is_persistent=True,
+    persist_directory=CHROMA_PERSIST_DIRECTORY
+))
+# Every API worker embeds through this process, so concurrent /embed calls are
+# worth micro-batching in a process pool (EMBEDDING_WORKERS > 0)
+if EMBEDDING_WORKERS > 0:
+    embedding_function = PooledEmbeddingFunction()
+else:
+    embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction()
+collection = chroma_client.get_or_create_collection(
+    name=CHROMA_COLLECTION_NAME,
+    embedding_function=embedding_function
+)
+lexical_index = BM25Index()
+# Start from the clock so versions never repeat across service restarts
+collection_version = CollectionVersion(initial=time.time_ns() // 1_000_000)
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
+class AddRequest(BaseModel):
+    ids: List[str]
+    documents: List[str]
+    metadatas: Optional[List[Dict[str, Any]]] = None
+    embeddings: Optional[List[List[float]]] = None
+
+class QueryRequest(BaseModel):
+    query_embeddings: Optional[List[List[float]]] = None
+    query_texts: Optional[List[str]] = None
+    n_results: int = 10
+    include: List[str] = ["documents", "metadatas", "distances"]
+
+class GetRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    where: Optional[Dict[str, Any]] = None
+    limit: Optional[int] = None
+    offset: Optional[int] = None
+    include: List[str] = ["documents", "metadatas"]
+
+class DeleteRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    where: Optional[Dict[str, Any]] = None
+
+class LexicalSearchRequest(BaseModel):
+    query: str
+    n_results: int = 5
+
+
+def to_jsonable(value):
+    """Convert numpy arrays/scalars in Chroma results to plain JSON types"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+def embed_texts(texts: List[str]) -> list:
+    return to_jsonable(embedding_function(texts))
+
+
+@app.on_event("startup")
+def load_lexical_index(page_size: int = 5000):
+    offset = 0
+    while True:
+        page = collection.get(include=["documents"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        lexical_index.add(page["ids"], page["documents"])
+        offset += len(page["ids"])
+    logger.info(f"Lexical index loaded with {len(lexical_index)} chunks")
+
+
+@app.on_event("shutdown")
+def shutdown_embedding_pool():
+    if isinstance(embedding_function, PooledEmbeddingFunction):
+        embedding_function.shutdown()
+
+
+@app.post("/embed")
+async def embed(request: EmbedRequest):
+    return {"embeddings": await run_in_threadpool(embed_texts, request.texts)}
+
+
+@app.post("/add")
+def add(request: AddRequest):
+    embeddings = request.embeddings or embed_texts(request.documents)
+    collection.add(ids=request.ids, documents=request.documents,
+                   metadatas=request.metadatas, embeddings=embeddings)
+    lexical_index.add(request.ids, request.documents)
+    return {"version": collection_version.bump()}
+
+
+@app.post("/query")
+def query(request: QueryRequest):
+    embeddings = request.query_embeddings or embed_texts(request.query_texts or [])
+    if not embeddings:
+        return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+    return to_jsonable(collection.query(query_embeddings=embeddings, n_results=request.n_results,
+                                        include=request.include))
+
+
+@app.post("/get")
+def get(request: GetRequest):
+    return to_jsonable(collection.get(ids=request.ids, where=request.where, limit=request.limit,
+                                      offset=request.offset, include=request.include))
+
+
+@app.post("/delete")
+def delete(request: DeleteRequest):
+    # Resolve the ids first so the lexical index drops exactly what Chroma drops
+    ids = request.ids
+    if request.where is not None:
+        ids = collection.get(ids=ids, where=request.where, include=[])["ids"]
+    if ids:
+        collection.delete(ids=ids)
+        lexical_index.delete(ids)
+    return {"deleted": len(ids or []), "version": collection_version.bump()}
+
+
+@app.get("/count")
+def count():
+    return {"count": collection.count()}
+
+
+@app.post("/lexical/search")
+def lexical_search(request: LexicalSearchRequest):
+    return {"results": lexical_index.search(request.query, request.n_results)}
+
+
+@app.get("/version")
+def version():
+    return {"version": collection_version.current}